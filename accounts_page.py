@@ -2,12 +2,14 @@ from datetime import date
 
 import customtkinter as ctk
 from PIL import Image
-from sqlalchemy import desc
 
-from addition_classes import recolor_icon
 from category_creation import resource_path
-from db_management import session, AccountsTable, TransactionsTable, CategoriesTable
+from db_management import get_accounts, get_recent_transactions
+from event_bus import event_bus, LazyRefreshMixin
+from icon_cache import icon_cache
+from query_executor import query_executor
 from transfer_creation import NewTransferWindow
+from virtual_table import RecentRowsFrame
 
 acc_index = 0
 
@@ -49,7 +51,7 @@ class CanvasFrame(ctk.CTkFrame):
 
 
 class AccountEntityFrame(ctk.CTkScrollableFrame):
-    def __init__(self, master, data : list[AccountsTable], **kwargs):
+    def __init__(self, master, data : list, **kwargs):
         global acc_index
         super().__init__(master, **kwargs)
         self.configure(fg_color="#d9d9d9")
@@ -96,30 +98,38 @@ class AccountsFrame(ctk.CTkScrollableFrame):
         self.new_transfer = NewTransferWindow(app_instance)
         self.new_transfer.withdraw()
 
-        self.update_frame()
-
-    def update_frame(self):
-        accounts_sum = sum(float(acc.amount) for acc in session.query(AccountsTable).all())
-
         label = ctk.CTkLabel(self, text_color="black", text="Счета", font=("Arial", 24, "bold"))
         label.grid(row=0, column=0, sticky="w", padx=20, pady=20)
 
-        amount_sum = ctk.CTkLabel(self, text=f"Итого: {accounts_sum:,.2f}", text_color="black",
-                                       font=("Arial", 20, "bold"))
-        amount_sum.grid(row=0, column=1, sticky="we", padx=20, pady=40)
+        self.amount_sum = ctk.CTkLabel(self, text_color="black", font=("Arial", 20, "bold"))
+        self.amount_sum.grid(row=0, column=1, sticky="we", padx=20, pady=40)
 
         create_transfer_button = ctk.CTkButton(self, text_color="black", text="Добавить перевод",
                                                command=self._create_transfer)
         create_transfer_button.grid(row=0, column=2, sticky="e", padx=20, pady=20)
 
-        standard_accounts = AccountEntityFrame(self, session.query(AccountsTable).filter_by(type="Обычный").all())
-        standard_accounts.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=10, pady=10)
+        self.accounts_frames = []
+        self.update_frame()
 
-        cred_accounts = AccountEntityFrame(self, session.query(AccountsTable).filter_by(type="Кредитный").all())
-        cred_accounts.grid(row=2, column=0, columnspan=3, sticky="nsew", padx=10, pady=10)
+    def update_frame(self):
+        self.amount_sum.configure(text="Итого: загрузка...")
+        query_executor.run_in_background(self, get_accounts, on_done=self.show_accounts, key="accounts")
 
-        accum_accounts = AccountEntityFrame(self, session.query(AccountsTable).filter_by(type="Накопительный").all())
-        accum_accounts.grid(row=3, column=0, columnspan=3, sticky="nsew", padx=10, pady=10)
+    def show_accounts(self, accounts):
+        accounts_sum = sum(float(acc.amount) for acc in accounts)
+        self.amount_sum.configure(text=f"Итого: {accounts_sum:,.2f}")
+
+        for frame in self.accounts_frames:
+            frame.destroy()
+        self.accounts_frames.clear()
+
+        for row, account_type in enumerate(("Обычный", "Кредитный", "Накопительный"), start=1):
+            data = [acc for acc in accounts if acc.type == account_type]
+            if not data:
+                continue
+            accounts_frame = AccountEntityFrame(self, data)
+            accounts_frame.grid(row=row, column=0, columnspan=3, sticky="nsew", padx=10, pady=10)
+            self.accounts_frames.append(accounts_frame)
 
     def _create_transfer(self):
         if not self.new_transfer.winfo_exists():
@@ -132,7 +142,9 @@ class AccountsFrame(ctk.CTkScrollableFrame):
 
         self.new_transfer.bind("<<DateSelected>>", lambda x: self.new_transfer.destroy())
 
-class TransactionsFrame(ctk.CTkScrollableFrame):
+class TransactionsFrame(RecentRowsFrame):
+    first_row = 1  # под заголовком
+
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
 
@@ -145,31 +157,32 @@ class TransactionsFrame(ctk.CTkScrollableFrame):
         self.update_frame()
 
     def update_frame(self):
-        trans_cat_model = session.query(CategoriesTable, TransactionsTable
-                                ).join(TransactionsTable, TransactionsTable.category_id == CategoriesTable.category_id
-                                ).order_by(desc(TransactionsTable.transaction_date_time)).all()
+        query_executor.run_in_background(self, get_recent_transactions, None, self.limit,
+                                         on_done=self.apply_rows, key="transactions")
 
-        for i, (cat, trans) in enumerate(trans_cat_model):
-            icon_image = ctk.CTkImage(light_image=recolor_icon(resource_path(
-                f"assets/{cat.icon_url}"), cat.colour), size=(40, 40))
-            icon_label = ctk.CTkLabel(self, image=icon_image, text="", width=50, height=50)
-            icon_label.grid(row=i+1, column=0, padx=(10, 0), pady=10, sticky="nwe")
+    def row_key(self, trans):
+        return trans.transaction_id
 
-            transaction_name = ctk.CTkLabel(self, text_color="black", font=("Arial", 14), wraplength=120, justify="left",
-                                            text=trans.description if trans.description != "" else "<без комментария>")
-            transaction_name.grid(row=i+1, column=1, padx=5, pady=10, sticky="nw")
+    def create_row(self, trans, row):
+        icon_image = icon_cache.ctk_image(resource_path(f"assets/{trans.icon_url}"), trans.colour, size=(40, 40))
+        icon_label = ctk.CTkLabel(self, image=icon_image, text="", width=50, height=50)
+        icon_label.grid(row=row, column=0, padx=(10, 0), pady=10, sticky="nwe")
 
-            date_label = ctk.CTkLabel(self, text=f"{trans.transaction_date_time.day}"
-                                                 f".0{trans.transaction_date_time.month}",
-                                      text_color="black", font=("Arial", 14))
-            date_label.grid(row=i+1, column=2, padx=(5, 0), pady=10, sticky="nw")
+        transaction_name = ctk.CTkLabel(self, text_color="black", font=("Arial", 14), wraplength=120, justify="left",
+                                        text=trans.description if trans.description != "" else "<без комментария>")
+        transaction_name.grid(row=row, column=1, padx=5, pady=10, sticky="nw")
 
-            amount_label = ctk.CTkLabel(self, text=f"{trans.amount:,.2f}", font=("Arial", 14),
-                                        text_color="green" if cat.transaction_type == "Доход" else "red")
-            amount_label.grid(row=i+1, column=3, padx=(10, 0), pady=10, sticky="nw")
+        date_label = ctk.CTkLabel(self, text=trans.transaction_date_time.strftime("%d.%m"),
+                                  text_color="black", font=("Arial", 14))
+        date_label.grid(row=row, column=2, padx=(5, 0), pady=10, sticky="nw")
 
+        amount_label = ctk.CTkLabel(self, text=f"{trans.amount:,.2f}", font=("Arial", 14),
+                                    text_color="green" if trans.transaction_type == "Доход" else "red")
+        amount_label.grid(row=row, column=3, padx=(10, 0), pady=10, sticky="nw")
+        return [icon_label, transaction_name, date_label, amount_label]
 
-class AccountsPage(ctk.CTkFrame):
+
+class AccountsPage(LazyRefreshMixin, ctk.CTkFrame):
     def __init__(self, master, app_instance, **kwargs):
         super().__init__(master, **kwargs)
 
@@ -183,9 +196,9 @@ class AccountsPage(ctk.CTkFrame):
         self.transactions_frame = TransactionsFrame(self, orientation="vertical")
         self.transactions_frame.grid(row=0, column=1, sticky="nsew", padx=(10, 20), pady=20)
 
-    def update_transactions(self):
-        self.transactions_frame.update_frame()
-        self.accounts_frame.update_frame()
-
-    def update_transfers(self):
-        self.accounts_frame.update_frame()
\ No newline at end of file
+        self.init_lazy_refresh({
+            "accounts": self.accounts_frame.update_frame,
+            "transactions": self.transactions_frame.update_frame,
+        })
+        event_bus.subscribe("transaction", lambda event: self.mark_dirty("accounts", "transactions"))
+        event_bus.subscribe("transfer", lambda event: self.mark_dirty("accounts"))
\ No newline at end of file
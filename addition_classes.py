@@ -1,17 +1,22 @@
 import datetime
+import functools
+import math
 import os
 import sys
-import tkinter as tk
 from pathlib import Path
-
-import numpy as np
+from typing import NamedTuple, TYPE_CHECKING
 
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from PIL import Image
+from sqlalchemy import func
+
+from db_management import CategoriesTable, DailyCategoryTotalsTable
+from query_cache import query_cache
+from named_colors import NAMED_COLORS
 
-from db_management import session, CategoriesTable, TransactionsTable
+# numpy и matplotlib импортируются при первом построении диаграммы, а не при запуске приложения
+if TYPE_CHECKING:
+    import numpy as np
 
 def to_path_obj(relative_path: str) -> Path:
     parts = relative_path.split('/')
@@ -21,37 +26,77 @@ def resource_path(relative_path: str):
     base_path = getattr(sys, '_MEIPASS', os.path.abspath("."))
     return os.path.join(base_path, to_path_obj(relative_path))
 
-def get_expense_data(start_date, end_date, period: str):
-    categories = {c.category_id: {"name": c.category_name, "color": c.colour}
-                  for c in session.query(CategoriesTable).all()}
-
-    expenses = session.query(TransactionsTable).filter(
-        TransactionsTable.transaction_type == "Расход",
-        TransactionsTable.transaction_date_time >= start_date,
-        TransactionsTable.transaction_date_time <= end_date
-    ).all()
+class ExpenseData(NamedTuple):
+    """Расходы за период: матрица категория × день и метаданные категорий"""
+    names: list[str]
+    colors: list[str]
+    values: "np.ndarray"
+
+
+@query_cache.cached("daily_category_totals", "categories")
+def get_category_totals(db_session, date_from, date_to, transaction_type: str = "Расход"):
+    """Суммы по категориям за период [date_from, date_to] из таблицы дневных итогов"""
+    return (
+        db_session.query(
+            CategoriesTable.category_name,
+            CategoriesTable.icon_url,
+            CategoriesTable.colour,
+            func.sum(DailyCategoryTotalsTable.total_amount).label("total_amount")
+        )
+        .join(DailyCategoryTotalsTable, DailyCategoryTotalsTable.category_id == CategoriesTable.category_id)
+        .filter(
+            DailyCategoryTotalsTable.transaction_type == transaction_type,
+            DailyCategoryTotalsTable.day >= date_from,
+            DailyCategoryTotalsTable.day <= date_to
+        )
+        .group_by(CategoriesTable.category_id, CategoriesTable.category_name,
+                  CategoriesTable.icon_url, CategoriesTable.colour)
+        .order_by(func.sum(DailyCategoryTotalsTable.total_amount).desc())
+        .all()
+    )
+
+
+@query_cache.cached("daily_category_totals", "categories")
+def get_expense_data(db_session, start_date, end_date) -> ExpenseData:
+    import numpy as np
 
     days = (end_date - start_date).days + 1
 
-    result = {}
-    for t in expenses:
-        category = categories.get(t.category_id)
-        if not category:
-            continue
-
-        cat_name = category["name"]
-        cat_color = category["color"]
-        day_index = (t.transaction_date_time.date() - start_date).days
-
-
-        if cat_name not in result:
-            result[cat_name] = {
-                "color": cat_color,
-                "values": [0.0] * days
-            }
+    # Итоги уже посчитаны по дням: одна строка на пару (категория, день)
+    rows = (
+        db_session.query(
+            CategoriesTable.category_id,
+            CategoriesTable.category_name,
+            CategoriesTable.colour,
+            DailyCategoryTotalsTable.day,
+            DailyCategoryTotalsTable.total_amount
+        )
+        .join(DailyCategoryTotalsTable, DailyCategoryTotalsTable.category_id == CategoriesTable.category_id)
+        .filter(
+            DailyCategoryTotalsTable.transaction_type == "Расход",
+            DailyCategoryTotalsTable.day >= start_date,
+            DailyCategoryTotalsTable.day <= end_date
+        )
+        .order_by(CategoriesTable.category_name)
+        .all()
+    )
+
+    index = {}
+    names = []
+    colors = []
+    for row in rows:
+        if row.category_id not in index:
+            index[row.category_id] = len(names)
+            names.append(row.category_name)
+            colors.append(row.colour)
+
+    values = np.zeros((len(names), days))
+    for row in rows:
+        day_index = (row.day - start_date).days
         if 0 <= day_index < days:
-            result[cat_name]["values"][day_index] += float(t.amount)
-    return result
+            values[index[row.category_id], day_index] = float(row.total_amount)
+
+    return ExpenseData(names, colors, values)
 
 app_color = {
     "light_blue" : "#90abd1",
@@ -59,40 +104,44 @@ app_color = {
     "blue" : "#1f6aa5"
 }
 
-def hex_to_rgb(color: str):
+@functools.lru_cache(maxsize=1024)
+def hex_to_rgb(color: str) -> tuple[int, int, int]:
+    """
+    Цвет в формате Tk ("#rgb", "#rrggbb", "#rrrgggbbb", "#rrrrggggbbbb" или имя вроде "red")
+    в 8-битный RGB. Имена берутся из таблицы NAMED_COLORS, интерпретатор Tk не создаётся
+    """
     if color.startswith("#"):
-        color = color.lstrip('#')
-        return tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
-    else:
-        root = tk.Tk()
-        root.withdraw()
-        rgb_color = root.winfo_rgb(color)
-        root.destroy()
-        return tuple(v // 256 for v in rgb_color)
-
-def name_to_hex(name: str):
-    root = tk.Tk()
-    root.withdraw()
-    hex_color = root.winfo_rgb(name)
-    root.destroy()
-    return hex_color
-
-def recolor_icon(image_path: str, fg_color: str, bg_color: str = None):
-    fg_rgb = hex_to_rgb(fg_color)
-    bg_rgb = hex_to_rgb(bg_color) if bg_color else None
-
-    img = Image.open(image_path).convert("RGBA")
-    pixels = img.load()
-
-    for y in range(img.height):
-        for x in range(img.width):
-            r, g, b, a = pixels[x, y]
-            if a == 0:
-                if bg_rgb:
-                    pixels[x, y] = (*bg_rgb, 255)
-            else:
-                pixels[x, y] = (*fg_rgb, a)
-    return img
+        digits = color[1:]
+        width = len(digits) // 3
+        if width not in (1, 2, 3, 4) or len(digits) != width * 3:
+            raise ValueError(f"Неизвестный цвет: {color}")
+        # Как в Tk: каждая компонента дополняется нулями справа до 16 бит, затем берутся старшие 8
+        return tuple(int(digits[i:i + width], 16) << (16 - 4 * width) >> 8 for i in range(0, len(digits), width))
+
+    rgb = NAMED_COLORS.get(color.replace(" ", "").lower())
+    if rgb is None:
+        raise ValueError(f"Неизвестный цвет: {color}")
+    return rgb
+
+def name_to_hex(name: str) -> str:
+    return "#{:02x}{:02x}{:02x}".format(*hex_to_rgb(name))
+
+def recolor_icon(image_path: str | Image.Image, fg_color: str, bg_color: str = None):
+    """
+    Перекрашивает непрозрачные пиксели иконки (пути к файлу или уже открытого изображения) в fg_color,
+    сохраняя их прозрачность.
+    Полностью прозрачные пиксели заливаются bg_color (непрозрачным), если он задан, иначе не меняются
+    """
+    img = (image_path if isinstance(image_path, Image.Image) else Image.open(image_path)).convert("RGBA")
+    alpha = img.getchannel("A")
+
+    foreground = Image.new("RGBA", img.size, (*hex_to_rgb(fg_color), 0))
+    foreground.putalpha(alpha)
+    background = Image.new("RGBA", img.size, (*hex_to_rgb(bg_color), 255)) if bg_color else img
+
+    # Маска: 255 там, где пиксель хоть немного непрозрачен
+    opaque = alpha.point(lambda a: 255 if a else 0)
+    return Image.composite(foreground, background, opaque)
 
 class PeriodButtons(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
@@ -235,9 +284,201 @@ class ToggleButton(ctk.CTkButton):
         self.configure(fg_color=self.default_color)
 
 
-class MainPagePie(ctk.CTkFrame):
+class LazyFigureFrame(ctk.CTkFrame):
+    """
+    Рамка для диаграммы matplotlib. Сам matplotlib импортируется, а фигура создаётся
+    при первой отрисовке данных; до этого сообщения («Загрузка...») показываются обычной надписью
+    """
+    figsize = (7, 5)
+    dpi = 100
+    canvas_sticky = "nsew"
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.fig = self.ax = self.canvas = None
+        self.message_label = ctk.CTkLabel(self, text="", text_color="gray", font=("Arial", 18))
+
+    def ensure_figure(self):
+        if self.fig is not None:
+            return
+
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        self.ax = self.fig.add_subplot()
+        self.style_axes()
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.message_label.grid_remove()
+        self.canvas.get_tk_widget().grid(row=0, column=0, sticky=self.canvas_sticky)
+
+    def style_axes(self):
+        """Цвета фигуры и осей; вызывается после создания фигуры и после очистки осей"""
+
+    def show_message(self, text: str):
+        if self.fig is None:
+            self.message_label.configure(text=text)
+            self.message_label.grid(row=0, column=0)
+            return
+
+        self.ax.clear()
+        self.style_axes()
+        self.ax.text(
+            0.5, 0.5, text,
+            fontsize=14, ha="center", va="center", transform=self.ax.transAxes,
+            color="gray"
+        )
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+        self.canvas.draw_idle()
+
+    def show_loading(self):
+        self.show_message("Загрузка...")
+
+
+def group_small_slices(values, labels, colors, share: float = 0.02):
+    """Сектора меньше share от суммы объединяются в один сектор «Другие (N)»"""
+    # Преобразуем decimal.Decimal в float
+    values_float = [float(value) for value in values]
+    threshold = sum(values_float) * share
+
+    filtered_values = []
+    filtered_labels = []
+    filtered_colors = []
+    other_value = 0.0
+    other_count = 0
+
+    for value, label, color in zip(values_float, labels, colors):
+        if value >= threshold:
+            filtered_values.append(value)
+            filtered_labels.append(label)
+            filtered_colors.append(color)
+        else:
+            other_value += value
+            other_count += 1
+
+    # Добавляем категорию "Другие" если есть мелкие сегменты
+    if other_value > 0:
+        filtered_values.append(other_value)
+        filtered_labels.append(f'Другие ({other_count})')
+        filtered_colors.append('#CCCCCC')
+    return filtered_values, filtered_labels, filtered_colors
+
+
+class PieChart:
+    """
+    Круговая диаграмма с легендой на готовых осях matplotlib, которая обновляется без пересоздания:
+    секторы, подписи процентов и легенда переиспользуются, а раскладка фигуры (tight_layout)
+    считается один раз для каждого числа строк легенды. Перерисовку холста вызывает владелец
+    """
+    start_angle = 90
+    pct_distance = 0.8
+    text_props = {'fontsize': 9, 'color': 'white', 'weight': 'bold'}
+
+    def __init__(self, fig, ax):
+        self.fig = fig
+        self.ax = ax
+        self.wedges = []
+        self.pct_texts = []
+        self.legend = None
+        self.layouts = {}  # число строк легенды -> параметры subplots_adjust
+
+        # То же оформление осей, что делают ax.pie и ax.axis('equal')
+        self.ax.set(frame_on=False, xticks=[], yticks=[])
+        self.ax.set_aspect('equal', adjustable='datalim')
+        self.message = self.ax.text(0.5, 0.5, "", fontsize=14, ha="center", va="center",
+                                    transform=self.ax.transAxes, color="gray", visible=False)
+
+    def _add_slice(self):
+        from matplotlib.patches import Wedge
+
+        wedge = Wedge((0, 0), 1, 0, 0, clip_on=False)
+        self.ax.add_patch(wedge)
+        self.wedges.append(wedge)
+        self.pct_texts.append(self.ax.text(0, 0, "", ha="center", va="center", **self.text_props))
+
+    def _apply_layout(self, legend_size: int):
+        layout = self.layouts.get(legend_size)
+        if layout is None:
+            self.fig.tight_layout()
+            params = self.fig.subplotpars
+            self.layouts[legend_size] = dict(left=params.left, right=params.right,
+                                             bottom=params.bottom, top=params.top)
+        else:
+            self.fig.subplots_adjust(**layout)
+
+    def update(self, values, labels, colors, title=""):
+        values, labels, colors = group_small_slices(values, labels, colors)
+        total = sum(values)
+        while len(self.wedges) < len(values):
+            self._add_slice()
+
+        # Углы секторов считаются так же, как в ax.pie: против часовой стрелки от start_angle
+        theta1 = self.start_angle / 360
+        for i, (wedge, pct_text) in enumerate(zip(self.wedges, self.pct_texts)):
+            visible = i < len(values)
+            wedge.set_visible(visible)
+            pct_text.set_visible(visible)
+            if not visible:
+                continue
+
+            theta2 = theta1 + values[i] / total
+            wedge.set_theta1(360 * theta1)
+            wedge.set_theta2(360 * theta2)
+            wedge.set_facecolor(colors[i])
+
+            middle = math.pi * (theta1 + theta2)
+            pct = 100 * values[i] / total
+            pct_text.set_position((self.pct_distance * math.cos(middle), self.pct_distance * math.sin(middle)))
+            pct_text.set_text(f'{pct:.1f}%' if pct >= 3 else '')
+            theta1 = theta2
+
+        # Пределы осей заново по видимым секторам, как после ax.pie: иначе подгонка пределов
+        # под пропорции осей накапливалась бы от обновления к обновлению
+        self.ax.set(xlim=(-1.25, 1.25), ylim=(-1.25, 1.25))
+        self.ax.set_autoscale_on(True)
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+
+        # Легенда с подробной информацией
+        legend_labels = [f'{label}: {value:,.2f} ({value / total * 100:.1f}%)' for label, value in zip(labels, values)]
+        if self.legend is None or len(self.legend.legend_handles) != len(values):
+            # Размещаем легенду справа от диаграммы
+            self.legend = self.ax.legend(
+                self.wedges[:len(values)],
+                legend_labels,
+                title="Категории расходов",
+                loc="center left",
+                bbox_to_anchor=(1.1, 0, 0.5, 1),
+                fontsize=9
+            )
+            self._apply_layout(len(values))
+        else:
+            for handle, text, label, color in zip(self.legend.legend_handles, self.legend.get_texts(),
+                                                  legend_labels, colors):
+                handle.set_facecolor(color)
+                text.set_text(label)
+        self.legend.set_visible(True)
+
+        self.ax.set_title(title, fontsize=12, fontweight='bold', pad=20)
+        self.message.set_visible(False)
+
+    def show_message(self, text: str):
+        for artist in self.wedges + self.pct_texts:
+            artist.set_visible(False)
+        if self.legend is not None:
+            self.legend.set_visible(False)
+        self.message.set_text(text)
+        self.message.set_visible(True)
+
+
+class MainPagePie(LazyFigureFrame):
+    dpi = 110
+
     def __init__(self, master, values, labels, colors, title, **kwargs):
         super().__init__(master, **kwargs)
+        self.chart = None
 
         self.values = values
         self.labels = labels
@@ -247,93 +488,51 @@ class MainPagePie(ctk.CTkFrame):
         self.configure(fg_color="#949191")
         self.grid_propagate(False)
         self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        if values is None:
+            self.show_loading()
+        else:
+            self.create_pie_chart(values, labels, colors, title)
+
+    def ensure_figure(self):
+        super().ensure_figure()
+        if self.chart is None:
+            self.chart = PieChart(self.fig, self.ax)
 
-        self.fig, self.ax = plt.subplots(figsize=(7, 5), dpi=110)
+    def style_axes(self):
         self.fig.patch.set_facecolor('#949191')
         self.ax.set_facecolor('#949191')
 
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew")
-        self.create_pie_chart(values, labels, colors, title)
+    def show_message(self, text: str):
+        if self.chart is None:
+            super().show_message(text)
+            return
+        # Диаграмма уже построена: прячем её, не очищая оси, чтобы потом переиспользовать
+        self.chart.show_message(text)
+        self.canvas.draw_idle()
 
     def create_pie_chart(self, values, labels, colors, title):
-        self.ax.clear()
-        
         if not values:
-            self.ax.text(
-                0.5, 0.5, "Нет данных за выбранный период",
-                fontsize=14, ha="center", va="center", transform=self.ax.transAxes,
-                color="gray"
-            )
-            self.ax.set_xticks([])
-            self.ax.set_yticks([])
-        else:
-            # Преобразуем decimal.Decimal в float
-            values_float = [float(value) for value in values]
-            total = sum(values_float)
-            threshold = total * 0.02
-            
-            filtered_values = []
-            filtered_labels = []
-            filtered_colors = []
-            other_value = 0.0
-            other_count = 0
-            
-            for value, label, color in zip(values_float, labels, colors):
-                if value >= threshold:
-                    filtered_values.append(value)
-                    filtered_labels.append(label)
-                    filtered_colors.append(color)
-                else:
-                    other_value += value
-                    other_count += 1
-            
-            # Добавляем категорию "Другие" если есть мелкие сегменты
-            if other_value > 0:
-                filtered_values.append(other_value)
-                filtered_labels.append(f'Другие ({other_count})')
-                filtered_colors.append('#CCCCCC')
-            
-            # Создаем диаграмму без подписей, но с процентами
-            wedges, texts, autotexts = self.ax.pie(
-                filtered_values,
-                colors=filtered_colors,
-                startangle=90,
-                autopct=lambda pct: f'{pct:.1f}%' if pct >= 3 else '',
-                pctdistance=0.8,
-                textprops={'fontsize': 9, 'color': 'white', 'weight': 'bold'}
-            )
-            
-            # Создаем легенду с подробной информацией
-            legend_labels = []
-            for label, value in zip(filtered_labels, filtered_values):
-                percentage = (value / total) * 100
-                legend_labels.append(f'{label}: {value:,.2f} ({percentage:.1f}%)')
-            
-            # Размещаем легенду справа от диаграммы
-            self.ax.legend(
-                wedges,
-                legend_labels,
-                title="Категории расходов",
-                loc="center left",
-                bbox_to_anchor=(1.1, 0, 0.5, 1),
-                fontsize=9
-            )
-            
-            self.ax.set_title(title, fontsize=12, fontweight='bold', pad=20)
-            self.ax.axis('equal')
-        
-        self.fig.tight_layout()
-        self.canvas.draw()
+            self.show_message("Нет данных за выбранный период")
+            return
+
+        self.ensure_figure()
+        self.chart.update(values, labels, colors, title)
+        self.canvas.draw_idle()
 
 
-class ExpensesPageStackedBar(ctk.CTkFrame):
-    def __init__(self, master, dates, title="", **kwargs):
+class ExpensesPageStackedBar(LazyFigureFrame):
+    figsize = (8, 4)
+    canvas_sticky = ""
+
+    def __init__(self, master, title="", **kwargs):
         super().__init__(master, **kwargs)
 
         self.title = title
         self.master = master
-        self.data_dict = get_expense_data(dates[0], dates[1], "week")
+        # Данные загружаются в фоне, см. ExpensesPage.update_chart
+        self.data: ExpenseData | None = None
 
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=6)
@@ -344,72 +543,55 @@ class ExpensesPageStackedBar(ctk.CTkFrame):
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
-        self.fig, self.ax = plt.subplots(figsize=(8, 4), dpi=100)
+        self.show_loading()
+
+    def style_axes(self):
         self.fig.patch.set_facecolor(self.cget("bg_color"))
         self.ax.set_facecolor(self.cget("bg_color"))
         for spine in self.ax.spines.values():
             spine.set_color(self.cget("bg_color"))
 
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
-        self.create_stacked_bar()
-        self.canvas.get_tk_widget().grid(row=0, column=0)
-
     def show_single_category(self, category_name: str):
-        self.ax.clear()
+        if self.data is None or category_name not in self.data.names:
+            self.show_message("Нет данных за выбранный период")
+            return
 
-        if not category_name in self.data_dict.keys():
-            self.ax.set_facecolor(self.cget("bg_color"))
-            for spine in self.ax.spines.values():
-                spine.set_color(self.cget("bg_color"))
+        self.ensure_figure()
+        self.ax.clear()
+        i = self.data.names.index(category_name)
 
-            self.ax.text(
-                0.5, 0.5, "Нет данных за выбранный период",
-                fontsize=14, ha="center", va="center", transform=self.ax.transAxes,
-                color="gray"
-            )
-            self.ax.set_xticks([])
-            self.ax.set_yticks([])
-            self.canvas.draw()
-        else:
-            bottoms = np.zeros(len(self.labels))
-            info = self.data_dict[category_name]
-            values = info["values"]
-            color = info["color"]
-
-            self.ax.bar(
-                self.labels,
-                values,
-                bottom=bottoms,
-                label=category_name,
-                color=color,
-                width=0.5
-            )
+        self.ax.bar(
+            self.labels,
+            self.data.values[i],
+            label=category_name,
+            color=self.data.colors[i],
+            width=0.5
+        )
 
-            self.ax.set_title(self.title)
-            self.ax.tick_params(axis='x', rotation=90)
+        self.ax.set_title(self.title)
+        self.ax.tick_params(axis='x', rotation=90)
 
         self.canvas.draw()
 
     def create_stacked_bar(self):
+        self.ensure_figure()
         self.ax.clear()
 
         if len(self.labels) == 1:
-            self.create_bar_for_single_day(len(self.data_dict) == 1)
+            self.create_bar_for_single_day(len(self.data.names) == 1)
         else:
-            bottoms = np.zeros(len(self.labels))
+            # Нижние границы столбцов — накопленная сумма по предыдущим категориям
+            bottoms = self.data.values.cumsum(axis=0) - self.data.values
 
-            for category, info in self.data_dict.items():
-                values = info["values"]
-                color = info["color"]
+            for i, category in enumerate(self.data.names):
                 self.ax.bar(
                     self.labels,
-                    values,
-                    bottom=bottoms,
+                    self.data.values[i],
+                    bottom=bottoms[i],
                     label=category,
-                    color=color,
+                    color=self.data.colors[i],
                     width=0.5
                 )
-                bottoms += np.array(values)
 
             self.ax.set_title(self.title)
             self.ax.tick_params(axis='x', rotation=90)
@@ -419,35 +601,23 @@ class ExpensesPageStackedBar(ctk.CTkFrame):
     def create_bar_for_single_day(self, one_cat: bool):
         self.ax.clear()
 
-        categories = list(self.data_dict.keys())
-        values = [info["values"][0] for info in self.data_dict.values()]
-        colors = [info["color"] for info in self.data_dict.values()]
+        categories = self.data.names
+        values = self.data.values[:, 0]
+        colors = self.data.colors
 
         self.ax.set_xlim(-0.5, 0.5) if one_cat else None
         bars = self.ax.bar(categories, values, color=colors, width=0.1)
 
-        self.ax.set_ylim(0, max(values) * 1.2 if any(values) else 1)
+        self.ax.set_ylim(0, values.max() * 1.2 if values.any() else 1)
         self.ax.tick_params(axis='x', rotation=0)
 
-    def update_data(self, new_data, period, date_from, date_to):
-        self.data_dict = new_data
+    def update_data(self, new_data: ExpenseData, period, date_from, date_to):
+        self.data = new_data
 
         delta_days = (date_to - date_from).days + 1
         self.labels = [(date_from + datetime.timedelta(days=i)).strftime("%d") for i in range(delta_days)]
 
-        if not any(info["values"] for info in new_data.values()):
-            self.ax.clear()
-            self.ax.set_facecolor(self.cget("bg_color"))
-            for spine in self.ax.spines.values():
-                spine.set_color(self.cget("bg_color"))
-
-            self.ax.text(
-                0.5, 0.5, "Нет данных за выбранный период",
-                fontsize=14, ha="center", va="center", transform=self.ax.transAxes,
-                color="gray"
-            )
-            self.ax.set_xticks([])
-            self.ax.set_yticks([])
-            self.canvas.draw()
+        if not new_data.names:
+            self.show_message("Нет данных за выбранный период")
         else:
-            self.create_stacked_bar()
\ No newline at end of file
+            self.create_stacked_bar()
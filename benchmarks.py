@@ -0,0 +1,767 @@
+"""
+Проверки производительности запросов на синтетических данных.
+
+Использование:
+    python benchmarks.py plans [--url URL] [--rows N]
+    python benchmarks.py paging [--url URL]
+    python benchmarks.py import [--url URL] [--rows N]
+    python benchmarks.py export [--url URL]
+    python benchmarks.py balances [--url URL]
+    python benchmarks.py stress [--url URL] [--operations N] [--naive]
+    python benchmarks.py startup [--budget-ms N]
+    python benchmarks.py icons [--icons DIR]
+    python benchmarks.py colors [--lookups N]
+    python benchmarks.py table
+    python benchmarks.py pie [--updates N]
+
+URL должен указывать на пустую тестовую БД (по умолчанию — SQLite в памяти,
+для stress — временный файл SQLite): таблицы пересоздаются и заполняются синтетическими данными.
+"""
+import argparse
+import csv
+import datetime
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tkinter as tk
+from collections import Counter
+from decimal import Decimal
+import tracemalloc
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+from sqlalchemy import create_engine, select, insert, func, cast, Date, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from db_management import (Base, AccountsTable, CategoriesTable, TransactionsTable, TransfersTable,
+                           period_range, get_transactions_history, get_transfers_history,
+                           ensure_balance_snapshots, get_balances, LEDGER_START, save_transaction, save_transfer)
+from statement_import import import_statement
+from data_export import export_transactions
+from addition_classes import recolor_icon, hex_to_rgb, group_small_slices, PieChart
+from named_colors import NAMED_COLORS
+from icon_cache import IconCache
+from icon_atlas import IconAtlas
+
+
+def fill_synthetic_data(engine, rows: int, accounts: int = 10, categories: int = 30, days: int = 3 * 365):
+    """Заполняет БД случайными транзакциями и переводами за последние days дней"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rnd = random.Random(42)
+    now = datetime.datetime.now()
+
+    with engine.begin() as connection:
+        connection.execute(insert(AccountsTable), [
+            {"type": "Обычный", "amount": 0, "icon_url": "icons/card.png", "description": f"Счёт {i}"}
+            for i in range(accounts)
+        ])
+        connection.execute(insert(CategoriesTable), [
+            {"category_name": f"Категория {i}", "transaction_type": "Расход" if i % 5 else "Доход",
+             "colour": "#144870", "icon_url": "icons/categories/food.png"}
+            for i in range(categories)
+        ])
+
+        batch = []
+        for _ in range(rows):
+            batch.append({
+                "account_id": rnd.randint(1, accounts),
+                "category_id": rnd.randint(1, categories),
+                "transaction_type": "Расход" if rnd.random() < 0.8 else "Доход",
+                "transaction_date_time": now - datetime.timedelta(seconds=rnd.randint(0, days * 86400)),
+                "amount": round(rnd.uniform(10, 5000), 2),
+                "description": ""
+            })
+            if len(batch) == 10000:
+                connection.execute(insert(TransactionsTable), batch)
+                batch.clear()
+        if batch:
+            connection.execute(insert(TransactionsTable), batch)
+
+        connection.execute(insert(TransfersTable), [
+            {"from_account": rnd.randint(1, accounts), "to_account": rnd.randint(1, accounts),
+             "transfer_date_time": now - datetime.timedelta(seconds=rnd.randint(0, days * 86400)),
+             "amount": round(rnd.uniform(10, 5000), 2), "description": ""}
+            for _ in range(max(rows // 10, 1))
+        ])
+
+        connection.execute(text("ANALYZE"))
+
+
+def synthetic_engine(url: str, rows: int, connect_args: dict = None, **options):
+    """Подключается к БД по url и заполняет её синтетическими данными (options передаются в fill_synthetic_data)"""
+    engine = create_engine(url, connect_args=connect_args or {})
+    fill_synthetic_data(engine, rows, **options)
+    return engine
+
+
+def explain(connection, statement) -> str:
+    compiled = statement.compile(connection, compile_kwargs={"literal_binds": True})
+    if connection.dialect.name == "sqlite":
+        plan = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        return "\n".join(row[-1] for row in plan)
+    plan = connection.execute(text(f"EXPLAIN {compiled}")).all()
+    return "\n".join(row[0] for row in plan)
+
+
+def check_plans(url: str, rows: int) -> bool:
+    engine = synthetic_engine(url, rows)
+
+    date_to = datetime.date.today()
+    date_from = date_to - datetime.timedelta(days=6)
+
+    expenses_by_category = (
+        select(TransactionsTable.category_id, func.sum(TransactionsTable.amount))
+        .where(TransactionsTable.transaction_type == "Расход",
+               period_range(TransactionsTable.transaction_date_time, date_from, date_to))
+        .group_by(TransactionsTable.category_id)
+    )
+    account_history = (
+        select(TransactionsTable.transaction_id, TransactionsTable.amount)
+        .where(TransactionsTable.account_id == 1,
+               period_range(TransactionsTable.transaction_date_time, date_from, date_to))
+        .order_by(TransactionsTable.transaction_date_time.desc())
+    )
+    # Прежний вариант условия — для сравнения, индекс по дате здесь не применим
+    cast_predicate = (
+        select(TransactionsTable.category_id, func.sum(TransactionsTable.amount))
+        .where(TransactionsTable.transaction_type == "Расход",
+               cast(TransactionsTable.transaction_date_time, Date) >= date_from,
+               cast(TransactionsTable.transaction_date_time, Date) <= date_to)
+        .group_by(TransactionsTable.category_id)
+    )
+
+    checks = [
+        ("Расходы по категориям за период", expenses_by_category, "ix_transactions_type_date_category"),
+        ("История счёта за период", account_history, "ix_transactions_account_date"),
+        ("Расходы за период через cast(..., Date)", cast_predicate, None),
+    ]
+
+    ok = True
+    with engine.connect() as connection:
+        for name, statement, expected_index in checks:
+            plan = explain(connection, statement)
+            passed = expected_index is None or expected_index in plan
+            ok = ok and passed
+            status = "—" if expected_index is None else ("✅" if passed else "❌")
+            print(f"{status} {name}\n{plan}\n")
+
+    return ok
+
+
+def measure_paging(url: str, sizes=(10000, 100000, 500000), page_size: int = 50):
+    """Время выборки первой и глубокой страницы истории в зависимости от объёма истории"""
+    for rows in sizes:
+        engine = synthetic_engine(url, rows)
+
+        # Курсор в середине синтетической истории (она охватывает три года)
+        middle = (datetime.datetime.now() - datetime.timedelta(days=365 * 1.5), 0)
+
+        with Session(engine) as db_session:
+            started = time.perf_counter()
+            get_transactions_history(db_session, limit=page_size)
+            first_page = time.perf_counter() - started
+
+            started = time.perf_counter()
+            get_transactions_history(db_session, after=middle, limit=page_size)
+            deep_page = time.perf_counter() - started
+
+        print(f"{rows:>7} транзакций: первая страница {first_page * 1000:.1f} мс, "
+              f"страница из середины {deep_page * 1000:.1f} мс")
+        engine.dispose()
+
+
+def measure_import(url: str, rows: int):
+    """Скорость импорта выписки из CSV с rows строками"""
+    engine = synthetic_engine(url, 0)
+    rnd = random.Random(42)
+    now = datetime.datetime.now()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "statement.csv"
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file, delimiter=";")
+            writer.writerow(("Дата", "Сумма", "Счёт", "Категория", "Описание"))
+            for _ in range(rows):
+                amount = rnd.uniform(-5000, 5000)
+                # Категория того же типа, что и операция: "Категория N" — доход при N, кратном 5
+                category = rnd.randrange(1, 30) if amount < 0 else rnd.randrange(0, 30, 5)
+                if amount < 0 and category % 5 == 0:
+                    category += 1
+                writer.writerow((
+                    (now - datetime.timedelta(seconds=rnd.randint(0, 365 * 86400))).strftime("%d.%m.%Y %H:%M:%S"),
+                    f"{amount:.2f}".replace(".", ","),
+                    f"Счёт {rnd.randint(0, 9)}",
+                    f"Категория {category}",
+                    "Покупка",
+                ))
+
+        with Session(engine) as db_session:
+            result = import_statement(db_session, path, "Счёт 0")
+
+    print(f"{result.imported} строк за {result.seconds:.2f} с: "
+          f"{result.imported / result.seconds:,.0f} строк/с, пропущено {result.skipped}")
+    engine.dispose()
+
+
+def measure_export(url: str, sizes=(10000, 100000, 1000000)):
+    """Пиковый расход памяти Python при выгрузке истории разного объёма"""
+    for rows in sizes:
+        engine = synthetic_engine(url, rows)
+
+        with tempfile.TemporaryDirectory() as directory, Session(engine) as db_session:
+            for file_format in ("csv", "jsonl"):
+                tracemalloc.start()
+                started = time.perf_counter()
+                export_transactions(db_session, Path(directory) / f"export.{file_format}")
+                seconds = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{rows:>8} транзакций, {file_format:<5}: {seconds:.2f} с, пик памяти {peak / 2**20:.1f} МБ")
+        engine.dispose()
+
+
+def measure_balances(url: str, sizes=(10000, 100000, 1000000)):
+    """Время расчёта остатков по журналу со снимками и без них"""
+    for rows in sizes:
+        engine = synthetic_engine(url, rows)
+        past_day = datetime.date.today() - datetime.timedelta(days=400)
+
+        with Session(engine) as db_session:
+            # Без снимков остаток на любой день, кроме текущего, считается по всему журналу счёта
+            started = time.perf_counter()
+            get_balances(db_session, LEDGER_START)
+            without_snapshots = time.perf_counter() - started
+
+            ensure_balance_snapshots(db_session)
+            db_session.commit()
+
+            started = time.perf_counter()
+            get_balances(db_session)
+            current = time.perf_counter() - started
+
+            started = time.perf_counter()
+            get_balances(db_session, past_day)
+            point_in_time = time.perf_counter() - started
+
+        print(f"{rows:>8} транзакций: без снимков {without_snapshots * 1000:.1f} мс, "
+              f"текущие {current * 1000:.1f} мс, на {past_day:%d.%m.%Y} {point_in_time * 1000:.1f} мс")
+        engine.dispose()
+
+
+def _naive_write(db_session, from_id: int, to_id: int, amount: Decimal):
+    # Прежний способ: прочитать остаток в Python, изменить и записать обратно
+    from_account = db_session.get(AccountsTable, from_id)
+    to_account = db_session.get(AccountsTable, to_id)
+    from_account.amount -= amount
+    to_account.amount += amount
+    db_session.add(TransfersTable(from_account=from_id, to_account=to_id,
+                                  transfer_date_time=datetime.datetime.now(), amount=amount, description=""))
+
+
+def stress_balances(url: str, writers=(1, 2, 4, 8), operations: int = 200, naive: bool = False) -> bool:
+    """
+    Параллельно записывает переводы и расходы из нескольких потоков и проверяет,
+    что остатки счетов сошлись с ожидаемыми, то есть ни одно обновление не потеряно
+    """
+    ok = True
+    for writers_count in writers:
+        engine = synthetic_engine(url, 0, connect_args={"timeout": 60} if url.startswith("sqlite") else {}, accounts=4)
+        with Session(engine) as db_session:
+            ensure_balance_snapshots(db_session)
+            db_session.commit()
+            initial = dict(db_session.execute(select(AccountsTable.account_id, AccountsTable.amount)).all())
+
+        expected = Counter()
+        failed = []
+        lock = threading.Lock()
+
+        def write(seed):
+            rnd = random.Random(seed)
+            changes = Counter()
+            errors = 0
+            for i in range(operations):
+                from_id, to_id = rnd.sample(sorted(initial), 2)
+                amount = Decimal(rnd.randint(1, 10000)) / 100
+                try:
+                    with Session(engine) as db_session:
+                        if naive:
+                            _naive_write(db_session, from_id, to_id, amount)
+                            changes[from_id] -= amount
+                            changes[to_id] += amount
+                        elif i % 2:
+                            save_transfer(db_session, TransfersTable(
+                                from_account=from_id, to_account=to_id,
+                                transfer_date_time=datetime.datetime.now(), amount=amount, description=""))
+                            changes[from_id] -= amount
+                            changes[to_id] += amount
+                        else:
+                            save_transaction(db_session, TransactionsTable(
+                                account_id=from_id, category_id=2, transaction_type="Расход",
+                                transaction_date_time=datetime.datetime.now(), amount=amount, description=""))
+                            changes[from_id] -= amount
+                        db_session.commit()
+                except OperationalError:
+                    errors += 1
+                    continue
+            with lock:
+                expected.update(changes)
+                failed.append(errors)
+
+        threads = [threading.Thread(target=write, args=(seed,)) for seed in range(writers_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+
+        with Session(engine) as db_session:
+            stored = dict(db_session.execute(select(AccountsTable.account_id, AccountsTable.amount)).all())
+            ledger = get_balances(db_session)
+
+        lost = sum(1 for account_id in initial
+                   if stored[account_id] != initial[account_id] + expected[account_id]
+                   or ledger[account_id] != stored[account_id])
+        written = writers_count * operations - sum(failed)
+        ok = ok and lost == 0
+        print(f"{'✅' if lost == 0 else '❌'} потоков {writers_count:>2}: {written / seconds:,.0f} операций/с, "
+              f"ошибок записи {sum(failed)}, счетов с потерянными обновлениями {lost}")
+        engine.dispose()
+
+    return ok
+
+
+STARTUP_PROBE = """
+import sys, time
+started = time.perf_counter()
+import main
+print(time.perf_counter() - started)
+print(",".join(name for name in ("matplotlib", "numpy") if name in sys.modules))
+"""
+
+
+def check_startup(budget_ms: float, runs: int = 5, top: int = 10) -> bool:
+    """
+    Импорт main.py в отдельном процессе: укладывается ли он в бюджет и не тянет ли matplotlib и numpy,
+    которые должны загружаться только при первом построении графика
+    """
+    project_dir = Path(__file__).resolve().parent
+    timings = []
+    slowest = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_PROBE],
+                                cwd=project_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"❌ Не удалось импортировать main.py:\n{result.stderr.splitlines()[-1]}")
+            return False
+        seconds, loaded = result.stdout.splitlines()[-2:]
+        timings.append(float(seconds))
+
+        # Строки -X importtime: "import time: собственное | накопленное | модуль", время в мкс
+        imports = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, module = line[len("import time:"):].split("|")
+            depth = (len(module) - len(module.lstrip()) - 1) // 2
+            if depth == 1:  # модули, которые импортирует сам main.py
+                imports.append((int(cumulative), module.strip()))
+        slowest = sorted(imports, reverse=True)[:top]
+
+    median_ms = statistics.median(timings) * 1000
+    print("Самые долгие импорты из main.py:")
+    for cumulative, module in slowest:
+        print(f"   {module:<35} {cumulative / 1000:8.1f} мс")
+
+    ok = True
+    if loaded:
+        print(f"❌ При запуске загружаются {loaded}: их нужно импортировать при первом построении графика")
+        ok = False
+    within_budget = median_ms <= budget_ms
+    print(f"{'✅' if within_budget else '❌'} импорт main.py: {median_ms:.0f} мс (медиана из {runs}), "
+          f"бюджет {budget_ms:.0f} мс")
+    return ok and within_budget
+
+
+def _recolor_icon_per_pixel(image_path: str, fg_color: str, bg_color: str = None):
+    """Прежняя попиксельная реализация recolor_icon — эталон для сравнения"""
+    fg_rgb = hex_to_rgb(fg_color)
+    bg_rgb = hex_to_rgb(bg_color) if bg_color else None
+
+    img = Image.open(image_path).convert("RGBA")
+    pixels = img.load()
+
+    for y in range(img.height):
+        for x in range(img.width):
+            r, g, b, a = pixels[x, y]
+            if a == 0:
+                if bg_rgb:
+                    pixels[x, y] = (*bg_rgb, 255)
+            else:
+                pixels[x, y] = (*fg_rgb, a)
+    return img
+
+
+def _synthetic_icons(directory: Path, count: int = 40, size: int = 512) -> list[Path]:
+    """Иконки вроде assets/icons: цветная фигура на прозрачном фоне со сглаженными краями"""
+    rng = random.Random(42)
+    paths = []
+    for i in range(count):
+        big = Image.new("RGBA", (size * 2, size * 2), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(big)
+        for _ in range(3):
+            box = sorted(rng.sample(range(size * 2), 2)) + sorted(rng.sample(range(size * 2), 2))
+            color = tuple(rng.randrange(256) for _ in range(3)) + (255,)
+            draw.ellipse((box[0], box[2], box[1], box[3]), fill=color)
+        path = directory / f"icon_{i}.png"
+        big.resize((size, size), Image.LANCZOS).save(path)
+        paths.append(path)
+    return paths
+
+
+def measure_icons(icons_dir: Path | None) -> bool:
+    """
+    Скорость recolor_icon в сравнении с попиксельной версией и совпадение результата до пикселя,
+    затем кэш иконок: первый запуск, повторные обращения из памяти и новый запуск с кэшем на диске
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = sorted(icons_dir.rglob("*.png")) if icons_dir and icons_dir.is_dir() else []
+        if paths:
+            print(f"Иконки из {icons_dir}: {len(paths)} шт.")
+        else:
+            paths = _synthetic_icons(Path(directory))
+            print(f"Папка с иконками не найдена, синтетические иконки: {len(paths)} шт. 512×512")
+
+        ok = True
+        for bg_color in (None, "#aba6a6"):
+            started = time.perf_counter()
+            expected = [_recolor_icon_per_pixel(str(path), "#1f6aa5", bg_color) for path in paths]
+            per_pixel = time.perf_counter() - started
+
+            started = time.perf_counter()
+            actual = [recolor_icon(str(path), "#1f6aa5", bg_color) for path in paths]
+            vectorized = time.perf_counter() - started
+
+            same = all(a.tobytes() == e.tobytes() for a, e in zip(actual, expected))
+            ok = ok and same
+            print(f"{'✅' if same else '❌'} фон {bg_color or 'прозрачный':<10}: попиксельно {per_pixel * 1000:8.1f} мс, "
+                  f"каналами {vectorized * 1000:7.1f} мс, ускорение ×{per_pixel / vectorized:.0f}"
+                  f"{'' if same else ', результат отличается'}")
+
+        disk_dir = Path(directory) / "cache"
+        cache = IconCache(disk_dir=disk_dir)
+        runs = [("первый запуск", cache), ("повторно, из памяти", cache),
+                ("новый запуск, кэш на диске", IconCache(disk_dir=disk_dir))]
+        for label, cache in runs:
+            started = time.perf_counter()
+            images = [cache.image(str(path), "#1f6aa5", "#aba6a6") for path in paths]
+            seconds = time.perf_counter() - started
+            same = all(i.tobytes() == e.tobytes() for i, e in zip(images, expected))
+            ok = ok and same
+            print(f"{'✅' if same else '❌'} кэш, {label:<27}: {seconds * 1000:7.1f} мс")
+
+        # Атлас: все иконки одной папки вместо отдельного открытия каждого PNG (как в окне выбора иконки)
+        icons_folder = Path(paths[0]).parent
+        folder_paths = sorted(icons_folder.glob("*.png"))
+        started = time.perf_counter()
+        for path in folder_paths:
+            with Image.open(path) as icon:
+                icon.load()
+        separate = time.perf_counter() - started
+
+        atlas_path = Path(directory) / "atlas.rgba"
+        IconAtlas(icons_folder, atlas_path).build()
+        atlas = IconAtlas(icons_folder, atlas_path)
+        started = time.perf_counter()
+        crops = [atlas.image(name) for name in atlas.names()]
+        from_atlas = time.perf_counter() - started
+        atlas.close()
+        print(f"{'✅' if len(crops) == len(folder_paths) else '❌'} {len(folder_paths)} иконок папки: "
+              f"по отдельности {separate * 1000:.1f} мс, из атласа {from_atlas * 1000:.1f} мс")
+        ok = ok and len(crops) == len(folder_paths)
+    return ok
+
+
+def _hex_to_rgb_via_tk(color: str):
+    """Прежняя реализация hex_to_rgb для имён цветов: отдельный интерпретатор Tk на каждый вызов"""
+    root = tk.Tk()
+    root.withdraw()
+    rgb_color = root.winfo_rgb(color)
+    root.destroy()
+    return tuple(v // 256 for v in rgb_color)
+
+
+def measure_colors(lookups: int) -> bool:
+    """
+    Скорость hex_to_rgb на смеси имён и hex-цветов: без мемоизации и с ней.
+    Если доступен дисплей, таблица имён сверяется с Tk и замеряется прежний способ через tk.Tk()
+    """
+    rng = random.Random(42)
+    names = sorted(NAMED_COLORS)
+    hex_colors = [f"#{rng.randrange(0x1000000):06x}" for _ in range(200)]
+    inputs = [rng.choice(names) if rng.random() < 0.5 else rng.choice(hex_colors) for _ in range(lookups)]
+
+    started = time.perf_counter()
+    for color in inputs:
+        hex_to_rgb.__wrapped__(color)
+    uncached = time.perf_counter() - started
+
+    hex_to_rgb.cache_clear()
+    started = time.perf_counter()
+    for color in inputs:
+        hex_to_rgb(color)
+    cached = time.perf_counter() - started
+    print(f"таблица без мемоизации: {lookups / uncached:>12,.0f} цветов/с")
+    print(f"таблица с мемоизацией:  {lookups / cached:>12,.0f} цветов/с")
+
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        print("Дисплей недоступен: сравнение с Tk пропущено")
+        return True
+    root.withdraw()
+    mismatched = [name for name in names if tuple(v // 256 for v in root.winfo_rgb(name)) != NAMED_COLORS[name]]
+    root.destroy()
+
+    sample = [rng.choice(names) for _ in range(50)]
+    started = time.perf_counter()
+    for color in sample:
+        _hex_to_rgb_via_tk(color)
+    via_tk = time.perf_counter() - started
+    print(f"прежний способ через tk.Tk(): {len(sample) / via_tk:>6,.0f} цветов/с")
+    print(f"{'❌' if mismatched else '✅'} таблица совпадает с Tk для {len(names) - len(mismatched)} из {len(names)} имён"
+          f"{': ' + ', '.join(mismatched[:10]) if mismatched else ''}")
+    return not mismatched
+
+
+class _ListRowProvider:
+    """Все строки уже в памяти: замеряется только таблица, без запросов к БД"""
+    loading = False
+    has_more = False
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def reset(self):
+        pass
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def load_more(self, widget, on_done):
+        pass
+
+
+def measure_table(sizes=(1000, 10000, 100000), height: int = 600, scrolls: int = 200, refreshes: int = 200) -> bool:
+    """
+    VirtualTable на историях разной длины: число виджетов, время обновления и прокрутки
+    не должны зависеть от числа строк. Затем RecentRowsFrame: число виджетов не должно расти
+    от обновления к обновлению. Нужен дисплей
+    """
+    import customtkinter as ctk
+    from virtual_table import VirtualTable, RecentRowsFrame
+
+    class Recent(RecentRowsFrame):
+        def row_key(self, row):
+            return row[0]
+
+        def create_row(self, row, grid_row):
+            label = ctk.CTkLabel(self, text=row[1], text_color="black")
+            label.grid(row=grid_row, column=0, sticky="w", padx=10, pady=5)
+            return [label]
+
+    class Table(VirtualTable):
+        headers = ["Дата", "Сумма", "Комментарий"]
+
+        def create_row(self, grid_row):
+            cells = [ctk.CTkLabel(self, text="", text_color="black") for _ in self.headers]
+            for col, label in enumerate(cells):
+                label.grid(row=grid_row, column=col, sticky="nsew", padx=10, pady=5)
+            return cells
+
+        def bind_row(self, cells, row):
+            for label, value in zip(cells, row):
+                label.configure(text=value)
+
+    try:
+        root = ctk.CTk()
+    except tk.TclError:
+        print("Дисплей недоступен: замер таблицы пропущен")
+        return True
+    root.geometry(f"800x{height}")
+
+    results = []
+    for rows_count in sizes:
+        rows = [(f"{i % 28 + 1:02d}.01.25", f"{i * 1.5:,.2f}", f"Операция {i}") for i in range(rows_count)]
+        table = Table(root, _ListRowProvider(rows))
+        table.pack(fill="both", expand=True)
+        root.update()
+
+        started = time.perf_counter()
+        table.update_frame()
+        root.update()
+        refresh = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(scrolls):
+            table.scroll_rows(7 if i % 2 == 0 else -3)
+            root.update_idletasks()
+        scroll = (time.perf_counter() - started) / scrolls
+
+        widgets = len(table.winfo_children())
+        results.append(widgets)
+        print(f"{rows_count:>7} строк: виджетов {widgets}, обновление {refresh * 1000:6.1f} мс, "
+              f"прокрутка {scroll * 1000:5.2f} мс за шаг")
+        table.destroy()
+
+    ok = len(set(results)) == 1
+    print(f"{'✅' if ok else '❌'} число виджетов не зависит от длины истории")
+
+    # Список последних операций: каждое обновление добавляет одну запись сверху
+    recent = Recent(root)
+    recent.pack(fill="both", expand=True)
+    counts = []
+    for newest in range(refreshes):
+        recent.apply_rows([(i, f"Операция {i}") for i in range(newest, newest - Recent.limit, -1) if i >= 0])
+        root.update_idletasks()
+        counts.append(len(recent.winfo_children()))
+    root.destroy()
+
+    flat = counts[-1] == counts[Recent.limit]
+    print(f"{'✅' if flat else '❌'} список последних операций: после {refreshes} обновлений виджетов {counts[-1]}")
+    return ok and flat
+
+
+def _rebuild_pie(fig, ax, values, labels, colors):
+    """Прежнее обновление диаграммы главной страницы: очистка осей, новый ax.pie, легенда и tight_layout"""
+    ax.clear()
+    values, labels, colors = group_small_slices(values, labels, colors)
+    total = sum(values)
+    wedges, _, _ = ax.pie(values, colors=colors, startangle=90, pctdistance=0.8,
+                          autopct=lambda pct: f'{pct:.1f}%' if pct >= 3 else '',
+                          textprops={'fontsize': 9, 'color': 'white', 'weight': 'bold'})
+    ax.legend(wedges, [f'{label}: {value:,.2f} ({value / total * 100:.1f}%)' for label, value in zip(labels, values)],
+              title="Категории расходов", loc="center left", bbox_to_anchor=(1.1, 0, 0.5, 1), fontsize=9)
+    ax.set_title("", fontsize=12, fontweight='bold', pad=20)
+    ax.axis('equal')
+    fig.tight_layout()
+
+
+def measure_pie(updates: int, categories: int = 12) -> None:
+    """
+    Время одного обновления круговой диаграммы (смена периода) вместе с отрисовкой:
+    прежняя полная перестройка и PieChart.update с переиспользованием секторов и раскладки
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rng = random.Random(42)
+    labels = [f"Категория {i}" for i in range(categories)]
+    colors = [f"#{rng.randrange(0x1000000):06x}" for _ in range(categories)]
+    # Периоды с разным числом категорий: раскладка считается один раз для каждого размера легенды
+    periods = []
+    for i in range(updates):
+        count = categories - i % 3
+        periods.append(([rng.uniform(100, 5000) for _ in range(count)], labels[:count], colors[:count]))
+
+    for name in ("полная перестройка", "PieChart.update"):
+        fig = Figure(figsize=(7, 5), dpi=110)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        chart = PieChart(fig, ax) if name == "PieChart.update" else None
+
+        timings = []
+        for values, period_labels, period_colors in periods:
+            started = time.perf_counter()
+            if chart is None:
+                _rebuild_pie(fig, ax, values, period_labels, period_colors)
+            else:
+                chart.update(values, period_labels, period_colors)
+            canvas.draw()
+            timings.append(time.perf_counter() - started)
+
+        # Первые обновления считают раскладку, дальше — установившийся режим
+        steady = timings[3:] or timings
+        print(f"{name:<20}: медиана {statistics.median(steady) * 1000:6.1f} мс, "
+              f"максимум {max(steady) * 1000:6.1f} мс на обновление")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Проверки производительности запросов")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plans_parser = subparsers.add_parser("plans", help="проверить использование индексов в планах запросов")
+    plans_parser.add_argument("--url", default="sqlite://", help="строка подключения к тестовой БД")
+    plans_parser.add_argument("--rows", type=int, default=200_000, help="количество синтетических транзакций")
+
+    paging_parser = subparsers.add_parser("paging", help="время выборки страниц истории")
+    paging_parser.add_argument("--url", default="sqlite://", help="строка подключения к тестовой БД")
+
+    import_parser = subparsers.add_parser("import", help="скорость импорта выписки")
+    import_parser.add_argument("--url", default="sqlite://", help="строка подключения к тестовой БД")
+    import_parser.add_argument("--rows", type=int, default=100_000, help="количество строк в выписке")
+
+    export_parser = subparsers.add_parser("export", help="расход памяти при выгрузке истории")
+    export_parser.add_argument("--url", default="sqlite://", help="строка подключения к тестовой БД")
+
+    balances_parser = subparsers.add_parser("balances", help="время расчёта остатков счетов")
+    balances_parser.add_argument("--url", default="sqlite://", help="строка подключения к тестовой БД")
+
+    stress_parser = subparsers.add_parser("stress", help="параллельная запись: потерянные обновления и пропускная способность")
+    stress_parser.add_argument("--url", help="строка подключения к тестовой БД (по умолчанию — временный файл SQLite)")
+    stress_parser.add_argument("--operations", type=int, default=200, help="операций на каждый поток")
+    stress_parser.add_argument("--naive", action="store_true", help="прежнее чтение-изменение-запись для сравнения")
+
+    startup_parser = subparsers.add_parser("startup", help="время импорта приложения и отложенная загрузка графиков")
+    startup_parser.add_argument("--budget-ms", type=float, default=1500, help="допустимое время импорта main.py, мс")
+
+    icons_parser = subparsers.add_parser("icons", help="скорость перекраски иконок")
+    icons_parser.add_argument("--icons", type=Path, default=Path(__file__).resolve().parent / "assets" / "icons",
+                              help="папка с PNG-иконками (по умолчанию assets/icons)")
+
+    colors_parser = subparsers.add_parser("colors", help="скорость перевода цветов в RGB")
+    colors_parser.add_argument("--lookups", type=int, default=200_000, help="количество переводимых цветов")
+
+    subparsers.add_parser("table", help="виджеты и скорость прокрутки таблицы истории (нужен дисплей)")
+
+    pie_parser = subparsers.add_parser("pie", help="время обновления круговой диаграммы")
+    pie_parser.add_argument("--updates", type=int, default=60, help="количество смен периода")
+
+    args = parser.parse_args()
+
+    if args.command == "plans":
+        sys.exit(0 if check_plans(args.url, args.rows) else 1)
+    elif args.command == "paging":
+        measure_paging(args.url)
+    elif args.command == "import":
+        measure_import(args.url, args.rows)
+    elif args.command == "export":
+        measure_export(args.url)
+    elif args.command == "balances":
+        measure_balances(args.url)
+    elif args.command == "stress":
+        if args.url:
+            sys.exit(0 if stress_balances(args.url, operations=args.operations, naive=args.naive) else 1)
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{Path(directory) / 'stress.db'}"
+            ok = stress_balances(url, operations=args.operations, naive=args.naive)
+        sys.exit(0 if ok else 1)
+    elif args.command == "startup":
+        sys.exit(0 if check_startup(args.budget_ms) else 1)
+    elif args.command == "icons":
+        sys.exit(0 if measure_icons(args.icons) else 1)
+    elif args.command == "colors":
+        sys.exit(0 if measure_colors(args.lookups) else 1)
+    elif args.command == "table":
+        sys.exit(0 if measure_table() else 1)
+    elif args.command == "pie":
+        measure_pie(args.updates)
@@ -7,8 +7,11 @@ from CustomTkinterMessagebox import CTkMessagebox
 from PIL import Image, ImageColor
 
 from addition_classes import ToggleButton, FormattedEntry, resource_path
-from db_management import session, CategoriesTable
+from db_management import session_scope, CategoriesTable
+from query_cache import mark_changed
+from event_bus import event_bus, ChangeEvent
 from transaction_creation import ButtonsFrame
+from icon_atlas import category_atlas
 
 
 def get_icon_names(folder_path: str) -> list[str]:
@@ -92,9 +95,9 @@ class IconsListFrame(ctk.CTkScrollableFrame):
         self.categories_buttons: list[ToggleButton] = []
 
         for image_name in self.categories_icons:
-            # Начальная иконка с серым цветом по умолчанию
+            # Начальная иконка с серым цветом по умолчанию; все иконки вырезаются из одного атласа
             image = ctk.CTkImage(
-                light_image=Image.open(resource_path(f"assets/icons/categories/{image_name}.png")), 
+                light_image=category_atlas.image(image_name),
                 size=(40, 40)
             )
             button = ToggleButton(
@@ -127,13 +130,13 @@ class IconsListFrame(ctk.CTkScrollableFrame):
 
     def update_icons_color(self, color: str):
         for button, icon_name in zip(self.categories_buttons, self.categories_icons):
-            new_icon = self.recolor_icon(f"assets/icons/categories/{icon_name}.png", color)
+            new_icon = self.recolor_icon(icon_name, color)
             button.configure(image=new_icon)
             button.image = new_icon
 
     @staticmethod
-    def recolor_icon(path: str, color: str) -> ctk.CTkImage:
-        img = Image.open(path).convert("RGBA")
+    def recolor_icon(icon_name: str, color: str) -> ctk.CTkImage:
+        img = category_atlas.image(icon_name).convert("RGBA")
         rgb = ImageColor.getrgb(color)
 
         r, g, b = Image.new("RGB", img.size, rgb).split()
@@ -319,25 +322,24 @@ class CategoryCreationPage(ctk.CTkToplevel):
             CTkMessagebox.messagebox(title="Ошибка!", text="Введите корректный цвет в формате HEX!")
             return
 
-        existing = session.query(CategoriesTable).filter_by(category_name=new_name).first()
-        if existing:
-            CTkMessagebox.messagebox(title="Ошибка!", text="Категория с таким названием уже существует!")
-            return
+        with session_scope() as db_session:
+            existing = db_session.query(CategoriesTable).filter_by(category_name=new_name).first()
+            if existing:
+                CTkMessagebox.messagebox(title="Ошибка!", text="Категория с таким названием уже существует!")
+                return
+
+            category = CategoriesTable(
+                category_name=new_name,
+                transaction_type=new_category_type,
+                colour=new_color,
+                icon_url=f"icons/categories/{new_icon_name}.png"
+            )
+            db_session.add(category)
+            mark_changed(db_session, "categories")
 
-        category = CategoriesTable(
-            category_name=new_name,
-            transaction_type=new_category_type,
-            colour=new_color,
-            icon_url=f"icons/categories/{new_icon_name}.png"
-        )
-        session.add(category)
-        session.commit()
-
-        # Обновляем категории в главном приложении
-        if hasattr(self.master, 'update_categories'):
-            self.master.update_categories()
-        elif hasattr(self.master.master, 'update_categories'):
-            self.master.master.update_categories()
+        # Сообщаем страницам о новой категории
+        event_bus.publish(ChangeEvent("category", category_id=category.category_id,
+                                      transaction_type=category.transaction_type))
             
         self.destroy()
 
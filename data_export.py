@@ -0,0 +1,229 @@
+"""
+Потоковая выгрузка транзакций и переводов в CSV, JSONL и Parquet.
+
+Строки читаются из БД серверным курсором пачками (stream_results + yield_per)
+и сразу записываются в файл, поэтому расход памяти не зависит от размера истории.
+Для Parquet нужен пакет pyarrow.
+
+Использование:
+    python data_export.py transactions история.csv [--date-from 2025-01-01] [--date-to 2025-12-31]
+                          [--account "Основная карта"] [--category "Еда"] [--receipts]
+    python data_export.py transfers переводы.jsonl [--date-from ...] [--date-to ...] [--account ...]
+"""
+import argparse
+import base64
+import csv
+import datetime
+import json
+from pathlib import Path
+
+from sqlalchemy import select, or_
+from sqlalchemy.orm import aliased
+
+from db_management import (Session, AccountsTable, CategoriesTable, TransactionsTable, TransfersTable,
+                           prepare_database)
+
+BATCH_SIZE = 10000
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+def _date_filters(column, date_from: datetime.date = None, date_to: datetime.date = None) -> list:
+    # Полуоткрытый диапазон, как в period_range, но каждая граница необязательна
+    filters = []
+    if date_from is not None:
+        filters.append(column >= datetime.datetime.combine(date_from, datetime.time.min))
+    if date_to is not None:
+        filters.append(column < datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min))
+    return filters
+
+
+def transactions_export_query(date_from: datetime.date = None, date_to: datetime.date = None,
+                              account_id: int = None, category_id: int = None, include_receipts: bool = False):
+    """Транзакции с названиями счёта и категории, от старых к новым"""
+    columns = [
+        TransactionsTable.transaction_id,
+        TransactionsTable.transaction_date_time,
+        TransactionsTable.transaction_type,
+        AccountsTable.description.label("account"),
+        CategoriesTable.category_name.label("category"),
+        TransactionsTable.amount,
+        TransactionsTable.description,
+    ]
+    if include_receipts:
+        columns.append(TransactionsTable.check_photo)
+
+    statement = (
+        select(*columns)
+        .join(AccountsTable, TransactionsTable.account_id == AccountsTable.account_id)
+        .outerjoin(CategoriesTable, TransactionsTable.category_id == CategoriesTable.category_id)
+        .where(*_date_filters(TransactionsTable.transaction_date_time, date_from, date_to))
+        .order_by(TransactionsTable.transaction_date_time, TransactionsTable.transaction_id)
+    )
+    if account_id is not None:
+        statement = statement.where(TransactionsTable.account_id == account_id)
+    if category_id is not None:
+        statement = statement.where(TransactionsTable.category_id == category_id)
+    return statement
+
+
+def transfers_export_query(date_from: datetime.date = None, date_to: datetime.date = None, account_id: int = None):
+    """Переводы с названиями счетов, от старых к новым"""
+    from_account = aliased(AccountsTable)
+    to_account = aliased(AccountsTable)
+
+    statement = (
+        select(
+            TransfersTable.transfer_id,
+            TransfersTable.transfer_date_time,
+            from_account.description.label("from_account"),
+            to_account.description.label("to_account"),
+            TransfersTable.amount,
+            TransfersTable.description,
+        )
+        .join(from_account, TransfersTable.from_account == from_account.account_id)
+        .join(to_account, TransfersTable.to_account == to_account.account_id)
+        .where(*_date_filters(TransfersTable.transfer_date_time, date_from, date_to))
+        .order_by(TransfersTable.transfer_date_time, TransfersTable.transfer_id)
+    )
+    if account_id is not None:
+        statement = statement.where(or_(TransfersTable.from_account == account_id,
+                                        TransfersTable.to_account == account_id))
+    return statement
+
+
+def stream_batches(db_session, statement, batch_size: int = BATCH_SIZE):
+    """Выдаёт результат запроса пачками по batch_size строк, не загружая его целиком"""
+    result = db_session.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+    yield from result.partitions()
+
+
+def _to_text(value):
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _write_csv(path, columns, batches) -> int:
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows([_to_text(value) for value in row] for row in batch)
+            count += len(batch)
+    return count
+
+
+def _write_jsonl(path, columns, batches) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8") as file:
+        for batch in batches:
+            file.writelines(
+                json.dumps(dict(zip(columns, map(_to_text, row))), ensure_ascii=False, default=str) + "\n"
+                for row in batch
+            )
+            count += len(batch)
+    return count
+
+
+def _parquet_type(pa, column: str):
+    if column.endswith("_date_time"):
+        return pa.timestamp("us")
+    if column.endswith("_id"):
+        return pa.int64()
+    if column == "amount":
+        return pa.decimal128(12, 2)
+    if column == "check_photo":
+        return pa.binary()
+    return pa.string()
+
+
+def _write_parquet(path, columns, batches) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для выгрузки в Parquet установите пакет pyarrow") from None
+
+    schema = pa.schema([(column, _parquet_type(pa, column)) for column in columns])
+    count = 0
+    # Каждая пачка записывается отдельной группой строк
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)],
+                schema=schema
+            ))
+            count += len(batch)
+    return count
+
+
+WRITERS = {"csv": _write_csv, "jsonl": _write_jsonl, "parquet": _write_parquet}
+
+
+def export_query(db_session, statement, path: str | Path, file_format: str = None,
+                 batch_size: int = BATCH_SIZE) -> int:
+    """
+    Выгружает результат запроса в файл и возвращает количество строк.
+    Формат определяется по расширению файла, если не задан явно
+    """
+    path = Path(path)
+    file_format = file_format or path.suffix.lstrip(".").lower()
+    if file_format not in WRITERS:
+        raise ValueError(f"Неизвестный формат выгрузки: {file_format}. Доступны: {', '.join(FORMATS)}")
+
+    columns = [column.name for column in statement.selected_columns]
+    return WRITERS[file_format](path, columns, stream_batches(db_session, statement, batch_size))
+
+
+def export_transactions(db_session, path: str | Path, date_from: datetime.date = None,
+                        date_to: datetime.date = None, account_id: int = None, category_id: int = None,
+                        include_receipts: bool = False, file_format: str = None) -> int:
+    statement = transactions_export_query(date_from, date_to, account_id, category_id, include_receipts)
+    return export_query(db_session, statement, path, file_format)
+
+
+def export_transfers(db_session, path: str | Path, date_from: datetime.date = None,
+                     date_to: datetime.date = None, account_id: int = None, file_format: str = None) -> int:
+    statement = transfers_export_query(date_from, date_to, account_id)
+    return export_query(db_session, statement, path, file_format)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Выгрузка транзакций и переводов в CSV, JSONL или Parquet")
+    parser.add_argument("table", choices=("transactions", "transfers"), help="что выгружать")
+    parser.add_argument("path", help="файл выгрузки; формат определяется по расширению")
+    parser.add_argument("--format", choices=FORMATS, help="формат, если расширение файла другое")
+    parser.add_argument("--date-from", type=datetime.date.fromisoformat, help="начальная дата (ГГГГ-ММ-ДД)")
+    parser.add_argument("--date-to", type=datetime.date.fromisoformat, help="конечная дата (ГГГГ-ММ-ДД)")
+    parser.add_argument("--account", help="только операции по счёту с этим названием")
+    parser.add_argument("--category", help="только транзакции этой категории")
+    parser.add_argument("--receipts", action="store_true", help="выгрузить фото чеков (base64 в CSV и JSONL)")
+    args = parser.parse_args()
+    if args.category and args.table == "transfers":
+        parser.error("у переводов нет категорий")
+
+    prepare_database()
+    with Session() as db_session:
+        account_id = category_id = None
+        if args.account:
+            account_id = db_session.scalar(select(AccountsTable.account_id)
+                                           .where(AccountsTable.description == args.account))
+            if account_id is None:
+                parser.error(f"счёт «{args.account}» не найден")
+        if args.category:
+            category_id = db_session.scalar(select(CategoriesTable.category_id)
+                                            .where(CategoriesTable.category_name == args.category))
+            if category_id is None:
+                parser.error(f"категория «{args.category}» не найдена")
+
+        if args.table == "transactions":
+            count = export_transactions(db_session, args.path, args.date_from, args.date_to,
+                                        account_id, category_id, args.receipts, args.format)
+        else:
+            count = export_transfers(db_session, args.path, args.date_from, args.date_to,
+                                     account_id, args.format)
+
+    print(f"✅ Выгружено строк: {count}")
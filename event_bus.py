@@ -0,0 +1,61 @@
+import datetime
+from collections import defaultdict
+from typing import Callable, NamedTuple
+
+
+class ChangeEvent(NamedTuple):
+    """Изменение данных: что добавлено и каких счетов, категории и даты оно касается"""
+    kind: str  # "transaction", "transfer" или "category"
+    account_ids: tuple = ()
+    category_id: int | None = None
+    transaction_type: str | None = None
+    date: datetime.date | None = None
+
+
+class EventBus:
+    """Шина событий внутри приложения: окна публикуют изменения, страницы на них подписываются"""
+    def __init__(self):
+        self._subscribers: dict[str, list[Callable]] = defaultdict(list)
+
+    def subscribe(self, kind: str, callback: Callable[[ChangeEvent], None]):
+        self._subscribers[kind].append(callback)
+
+    def unsubscribe(self, kind: str, callback: Callable[[ChangeEvent], None]):
+        if callback in self._subscribers[kind]:
+            self._subscribers[kind].remove(callback)
+
+    def publish(self, event: ChangeEvent):
+        for callback in list(self._subscribers[event.kind]):
+            callback(event)
+
+
+class LazyRefreshMixin:
+    """
+    Для страниц: изменённые области помечаются «грязными» и перерисовываются,
+    только когда страница видна — сразу или при следующем показе (см. App.show_page)
+    """
+    def init_lazy_refresh(self, regions: dict[str, Callable[[], None]]):
+        self._refresh_regions = regions
+        self._dirty_regions = set()
+
+    def mark_dirty(self, *regions: str):
+        self._dirty_regions.update(regions)
+        if self.winfo_ismapped():
+            self.refresh_dirty()
+
+    def refresh_dirty(self):
+        # Порядок областей — как при регистрации, чтобы перерисовка была предсказуемой
+        dirty = [region for region in self._refresh_regions if region in self._dirty_regions]
+        self._dirty_regions.clear()
+        for region in dirty:
+            self._refresh_regions[region]()
+
+
+def date_in_period(date: datetime.date | None, period: list) -> bool:
+    """Попадает ли дата события в выбранный на странице период; без даты считаем, что попадает"""
+    if date is None or not period or period[0] is None:
+        return True
+    return period[0] <= date <= (period[1] or period[0])
+
+
+event_bus = EventBus()
@@ -1,11 +1,14 @@
 import datetime
 
 import customtkinter as ctk
-from sqlalchemy import func
 
-from db_management import session, CategoriesTable, TransactionsTable
-from addition_classes import recolor_icon, get_expense_data, ExpensesPageStackedBar, PeriodButtons, ToggleButton
+from db_management import CategoriesTable, get_recent_transactions, get_total_amount
+from addition_classes import get_expense_data, ExpensesPageStackedBar, PeriodButtons, ToggleButton
 from category_creation import resource_path
+from query_executor import query_executor
+from query_cache import query_cache
+from icon_cache import icon_cache
+from event_bus import event_bus, LazyRefreshMixin, date_in_period
 
 def safe_format_currency(value, default="0.00"):
     """Безопасное форматирование денежных значений"""
@@ -16,6 +19,15 @@ def safe_format_currency(value, default="0.00"):
     except (ValueError, TypeError):
         return default
 
+@query_cache.cached("transactions", "categories")
+def get_income_data(db_session):
+    return get_total_amount(db_session, "Доход"), get_recent_transactions(db_session, "Доход")
+
+def get_expense_categories(db_session):
+    return (db_session.query(CategoriesTable.category_name, CategoriesTable.icon_url, CategoriesTable.colour)
+            .filter(CategoriesTable.transaction_type == "Расход")
+            .order_by(CategoriesTable.category_name).all())
+
 class StatsFrame(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
@@ -27,7 +39,7 @@ class StatsFrame(ctk.CTkFrame):
 
         self.days_delta = 6
 
-        self.stacked_bar = ExpensesPageStackedBar(self, master.transaction_date, title="")
+        self.stacked_bar = ExpensesPageStackedBar(self, title="")
         self.stacked_bar.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
 
     def update_by_category(self, category_name):
@@ -50,31 +62,32 @@ class IncomeFrame(ctk.CTkScrollableFrame):
         #                                   command=self._create_category)
         # self.add_category.grid(row=0, column=3, pady=10, sticky="nse")
 
-        self.categories_model = (
-            session.query(CategoriesTable, TransactionsTable)
-            .join(TransactionsTable, CategoriesTable.category_id == TransactionsTable.category_id)
-            .filter(TransactionsTable.transaction_type == 'Доход')
-            .all()
-        )
+        self.total_amount_label = ctk.CTkLabel(self, text_color="black", text="Итого за период: ...",
+                                               font=("Arial", 24))
+        self.total_amount_label.grid(row=1, column=0, columnspan=3, padx=20, pady=20, sticky="w")
+        self.rows_widgets = []
 
         self.update_frame()
 
     def update_frame(self):
-        total_amount = (session.query(func.sum(TransactionsTable.amount))
-            .filter(TransactionsTable.transaction_type == "Доход").scalar())
-        total_amount_label = ctk.CTkLabel(self, text_color="black",
-                                               text=f"Итого за период: {safe_format_currency(total_amount)}", font=("Arial", 24))
-        total_amount_label.grid(row=1, column=0, columnspan=3, padx=20, pady=20, sticky="w")
-
-        for i, (cat, trans) in enumerate(self.categories_model):
-            icon_image = ctk.CTkImage(
-                light_image=recolor_icon(resource_path(f"assets/{cat.icon_url}"), fg_color=cat.colour),
-                size=(50, 50)
-            )
+        self.total_amount_label.configure(text="Итого за период: загрузка...")
+        query_executor.run_in_background(self, get_income_data, on_done=self.show_income, key="income")
+
+    def show_income(self, income_data):
+        total_amount, transactions = income_data
+        self.total_amount_label.configure(text=f"Итого за период: {safe_format_currency(total_amount)}")
+
+        for widget in self.rows_widgets:
+            widget.destroy()
+        self.rows_widgets.clear()
+
+        for i, trans in enumerate(transactions):
+            icon_image = icon_cache.ctk_image(resource_path(f"assets/{trans.icon_url}"), fg_color=trans.colour,
+                                              size=(50, 50))
             icon_label = ctk.CTkLabel(self, image=icon_image, text="")
             icon_label.grid(row=i+2, column=0, pady=10, sticky="e")
 
-            category_name_label = ctk.CTkLabel(self, text_color="black", text=cat.category_name, font=("Arial", 20))
+            category_name_label = ctk.CTkLabel(self, text_color="black", text=trans.category_name, font=("Arial", 20))
             category_name_label.grid(row=i+2, column=1, pady=10, sticky="nsew")
 
             date_label = ctk.CTkLabel(self, text_color="black", text=trans.transaction_date_time.date(), font=("Arial", 20))
@@ -84,6 +97,8 @@ class IncomeFrame(ctk.CTkScrollableFrame):
                                         text=f"{trans.amount:,.2f}")
             amount_label.grid(row=i+2, column=3, padx=(0, 10), pady=10, sticky="e")
 
+            self.rows_widgets.extend([icon_label, category_name_label, date_label, amount_label])
+
     # УБИРАЕМ методы создания категории из этого класса
     # def _create_category(self):
     #     if not self.new_category.winfo_exists():
@@ -117,17 +132,26 @@ class CategoriesFrame(ctk.CTkScrollableFrame):
                                                command=self.deselect_all, width=200, height=50)
         self.select_all_button.grid(row=1, column=0, columnspan=2, padx=20, pady=20)
 
+        self.cats = []
         self.categories_buttons = []
+        self.categories_labels = []
         self.selected_category_name = None
-        self.cats = (session.query(CategoriesTable).filter(CategoriesTable.transaction_type == "Расход")
-                     .order_by(CategoriesTable.category_name).all())
-
         self.update_categories()
 
     def update_categories(self):
+        query_executor.run_in_background(self, get_expense_categories, on_done=self.show_categories,
+                                         key="categories")
+
+    def show_categories(self, cats):
+        self.cats = cats
+        for widget in self.categories_buttons + self.categories_labels:
+            widget.destroy()
+        self.categories_buttons.clear()
+        self.categories_labels.clear()
+
         for i, cat in enumerate(self.cats):
-            icon_image = ctk.CTkImage(light_image=recolor_icon(resource_path(f"assets/{cat.icon_url}"),
-                                                               fg_color=cat.colour), size=(50, 50))
+            icon_image = icon_cache.ctk_image(resource_path(f"assets/{cat.icon_url}"), fg_color=cat.colour,
+                                              size=(50, 50))
             category_button = ToggleButton(self, image=icon_image, text="", width=50, height=50,
                                             command=lambda n=cat.category_name: self.select_single(n))
             category_button.grid(row=i+2, column=0, padx=(30, 0), pady=10, sticky="w")
@@ -136,6 +160,7 @@ class CategoriesFrame(ctk.CTkScrollableFrame):
 
             category_name_label = ctk.CTkLabel(self, text_color="black", text=cat.category_name, font=("Arial", 18))
             category_name_label.grid(row=i+2, column=1, pady=10, sticky="w")
+            self.categories_labels.append(category_name_label)
 
     def select_single(self, selected_name):
         items = [cat.category_name for cat in self.cats]
@@ -162,7 +187,7 @@ class CategoriesFrame(ctk.CTkScrollableFrame):
         self.master.stats_frame.update_by_category(category_name)
 
 
-class ExpensesPage(ctk.CTkFrame):
+class ExpensesPage(LazyRefreshMixin, ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
 
@@ -187,9 +212,35 @@ class ExpensesPage(ctk.CTkFrame):
         self.categories_frame = CategoriesFrame(self, orientation="vertical")
         self.categories_frame.grid(row=0, column=1, rowspan=3, sticky="nsew", padx=(10, 20), pady=(20, 20))
 
+        self.update_chart(self.transaction_date, "week")
+
+        self.init_lazy_refresh({
+            "chart": lambda: self.update_chart(self.transaction_date, "Same"),
+            "income": self.income_frame.update_frame,
+            "categories": self.categories_frame.update_categories,
+        })
+        event_bus.subscribe("transaction", self.on_transaction_added)
+        event_bus.subscribe("category", self.on_category_added)
+
+    def on_transaction_added(self, event):
+        if event.transaction_type == "Доход":
+            self.mark_dirty("income")
+        elif date_in_period(event.date, self.transaction_date):
+            self.mark_dirty("chart")
+
+    def on_category_added(self, event):
+        # Здесь показываются только категории расходов
+        if event.transaction_type == "Расход":
+            self.mark_dirty("categories")
+
     def update_chart(self, dates: list[datetime.date], period):
-        new_data = get_expense_data(dates[0], dates[1], period)
-        self.stats_frame.stacked_bar.update_data(new_data, period, dates[0], dates[1])
+        date_from, date_to = dates[0], dates[1]
+
+        self.stats_frame.stacked_bar.show_loading()
+        query_executor.run_in_background(
+            self, get_expense_data, date_from, date_to,
+            on_done=lambda new_data: self.stats_frame.stacked_bar.update_data(new_data, period, date_from, date_to),
+            key="chart")
 
     def update_delta(self, days):
         self.stats_frame.days_delta = days
@@ -197,9 +248,3 @@ class ExpensesPage(ctk.CTkFrame):
         today = datetime.date.today()
         self.transaction_date = [today - datetime.timedelta(days=days), today]
 
-    def update_transactions(self):
-        self.update_chart(self.transaction_date, "Same")
-        self.income_frame.update_frame()
-
-    def update_categories(self):
-        self.categories_frame.update_categories()
\ No newline at end of file
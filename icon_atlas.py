@@ -0,0 +1,166 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+from addition_classes import resource_path
+
+ATLAS_WIDTH = 2048  # ширина атласа, пикс.; иконка шире атласа расширяет его
+
+
+def default_cache_dir() -> Path:
+    """Папка кэша пользователя: %LOCALAPPDATA% в Windows, $XDG_CACHE_HOME или ~/.cache в остальных системах"""
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"])
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "finance_app" / "icons"
+
+
+class IconAtlas:
+    """
+    Все иконки папки в одном изображении-атласе и индекс с координатами каждой иконки.
+    Иконки хранятся в исходном размере, без масштабирования, поэтому вырезанная из атласа иконка
+    совпадает с файлом до пикселя. Атлас хранится несжатыми RGBA-пикселями (.rgba) и отображается в память,
+    поэтому при запуске не декодируется ни один PNG; индекс (.json) лежит рядом.
+    Атлас пересобирается, если набор иконок (имена и содержимое файлов) не совпадает с индексом
+    или после invalidate(); если записать его не удалось, он собирается в памяти
+    """
+    def __init__(self, icons_dir: str, atlas_path: str, width: int = ATLAS_WIDTH):
+        self.icons_dir = Path(icons_dir)
+        self.atlas_path = Path(atlas_path)
+        self.index_path = self.atlas_path.with_suffix(".json")
+        self.width = width
+        self._atlas = None
+        self._mapping = None
+        self._boxes = {}
+
+    def sources(self) -> list[list]:
+        """
+        Имена PNG-файлов папки и хэши их содержимого. Время изменения не годится: исполняемый файл
+        PyInstaller распаковывает иконки заново при каждом запуске
+        """
+        if not self.icons_dir.is_dir():
+            return []
+        return sorted([path.stem, hashlib.sha1(path.read_bytes()).hexdigest()]
+                      for path in self.icons_dir.glob("*.png"))
+
+    def build(self) -> bool:
+        """Собирает атлас из PNG-файлов папки и сохраняет его на диск; возвращает, удалось ли сохранить"""
+        self.close()
+        sources = self.sources()
+        icons = {}
+        for name, _ in sources:
+            with Image.open(self.icons_dir / f"{name}.png") as icon:
+                icons[name] = icon.convert("RGBA")
+        if not icons:
+            self._atlas = Image.new("RGBA", (1, 1), (0, 0, 0, 0))
+            return False
+
+        # Укладка полками: иконки по убыванию высоты слева направо, полка переносится, когда не хватает ширины
+        width = max(self.width, max(icon.width for icon in icons.values()))
+        boxes = {}
+        x = y = shelf_height = 0
+        for name in sorted(icons, key=lambda name: (-icons[name].height, name)):
+            icon = icons[name]
+            if x + icon.width > width:
+                x, y, shelf_height = 0, y + shelf_height, 0
+            boxes[name] = (x, y, x + icon.width, y + icon.height)
+            x += icon.width
+            shelf_height = max(shelf_height, icon.height)
+
+        atlas = Image.new("RGBA", (width, y + shelf_height), (0, 0, 0, 0))
+        for name, box in boxes.items():
+            atlas.paste(icons[name], box[:2])
+
+        self._atlas, self._boxes = atlas, boxes
+        index = {"size": atlas.size, "width": self.width, "sources": sources, "icons": boxes}
+        try:
+            self.atlas_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.atlas_path.with_name(f"{self.atlas_path.name}.{os.getpid()}.tmp")
+            temporary.write_bytes(atlas.tobytes())
+            os.replace(temporary, self.atlas_path)
+            self.index_path.write_text(json.dumps(index), encoding="utf-8")
+            return True
+        except OSError as e:
+            print(f"Не удалось сохранить атлас иконок {self.atlas_path}: {e}")
+            return False
+
+    def load(self):
+        """Отображает атлас в память, при необходимости сначала пересобрав его"""
+        if self._atlas is not None:
+            return
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            fresh = index["sources"] == self.sources() and index["width"] == self.width
+        except (OSError, ValueError, KeyError):
+            fresh = False
+        if not fresh:
+            self.build()
+            return
+
+        size = tuple(index["size"])
+        try:
+            with open(self.atlas_path, "rb") as atlas_file:
+                self._mapping = mmap.mmap(atlas_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._atlas = Image.frombuffer("RGBA", size, self._mapping, "raw", "RGBA", 0, 1)
+        except (OSError, ValueError):
+            # Отобразить файл в память не удалось — читаем его целиком
+            self.close()
+            try:
+                self._atlas = Image.frombytes("RGBA", size, self.atlas_path.read_bytes())
+            except (OSError, ValueError):
+                self.build()
+                return
+        self._boxes = {name: tuple(box) for name, box in index["icons"].items()}
+
+    def close(self):
+        self._atlas = None
+        self._boxes = {}
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def invalidate(self):
+        """Вызывается после замены иконок в папке: атлас пересоберётся при следующем обращении"""
+        self.close()
+        self.index_path.unlink(missing_ok=True)
+
+    def names(self) -> list[str]:
+        """Имена иконок по алфавиту"""
+        self.load()
+        return sorted(self._boxes)
+
+    def image(self, name: str) -> Image.Image:
+        """Иконка из атласа; иконка, добавленная после сборки атласа, читается из файла"""
+        self.load()
+        box = self._boxes.get(name)
+        if box is None:
+            return Image.open(self.icons_dir / f"{name}.png")
+        return self._atlas.crop(box)
+
+    def image_for_path(self, image_path: str) -> Image.Image | None:
+        """Иконка из атласа по пути к её PNG-файлу или None, если файл не из папки атласа"""
+        path = Path(image_path)
+        if path.suffix != ".png" or not self.icons_dir.is_dir() or not path.parent.is_dir() \
+                or not path.parent.samefile(self.icons_dir):
+            return None
+        self.load()
+        box = self._boxes.get(path.stem)
+        return self._atlas.crop(box) if box else None
+
+
+# Атлас лежит в папке кэша пользователя, а не рядом с иконками: исполняемый файл PyInstaller
+# распаковывает ресурсы во временную папку заново при каждом запуске
+category_atlas = IconAtlas(resource_path("assets/icons/categories"),
+                           default_cache_dir() / "categories_atlas.rgba")
+
+
+if __name__ == '__main__':
+    saved = category_atlas.build()
+    print(f"{'Атлас сохранён' if saved else 'Атлас не сохранён'}: {len(category_atlas.names())} иконок, "
+          f"{category_atlas.atlas_path}")
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import customtkinter as ctk
+from PIL import Image
+
+from addition_classes import recolor_icon
+from icon_atlas import category_atlas, default_cache_dir
+
+
+class IconCache:
+    """
+    Общий LRU-кэш перекрашенных иконок (PIL-изображений и CTkImage).
+    Ключ в памяти — путь к иконке, время изменения и размер файла, цвета и размер CTkImage,
+    поэтому заменённый на диске файл перекрашивается заново.
+    Если задана disk_dir, перекрашенные изображения сохраняются туда под хэшем содержимого исходного файла
+    и при следующих запусках читаются готовыми. Папка на диске ограничена max_disk_bytes:
+    при превышении удаляются давно не использованные иконки (время изменения файла обновляется при чтении)
+    """
+    def __init__(self, max_entries: int = 512, disk_dir: Path | None = None, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_bytes = None  # размер папки на диске, считается при первой записи
+        self._images = OrderedDict()
+        self._ctk_images = OrderedDict()
+        self._hashes = {}  # (путь, время изменения, размер) -> хэш содержимого
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.disk_hits = 0
+
+    def _lookup(self, entries: OrderedDict, key):
+        with self._lock:
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def _store(self, entries: OrderedDict, key, value):
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def _file_hash(self, stamp: tuple) -> str:
+        with self._lock:
+            digest = self._hashes.get(stamp)
+        if digest is None:
+            # Хэш считается без блокировки: параллельный подсчёт того же файла даст тот же результат
+            digest = hashlib.sha1(Path(stamp[0]).read_bytes()).hexdigest()
+            with self._lock:
+                self._hashes[stamp] = digest
+        return digest
+
+    def _disk_path(self, stamp: tuple, fg_color: str, bg_color: str | None) -> Path:
+        colors = f"{fg_color}_{bg_color or 'none'}".replace("#", "")
+        return self.disk_dir / f"{self._file_hash(stamp)}_{colors}.png"
+
+    def _load_from_disk(self, path: Path) -> Image.Image | None:
+        try:
+            with Image.open(path) as cached:
+                cached.load()
+                image = cached.copy()
+            os.utime(path)
+            return image
+        except (OSError, ValueError):
+            return None
+
+    def _save_to_disk(self, path: Path, image: Image.Image):
+        # Сначала во временный файл: другой запуск не прочитает недописанную иконку
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+            image.save(temporary, format="PNG", compress_level=1)
+            os.replace(temporary, path)
+            size = path.stat().st_size
+        except OSError as e:
+            print(f"Не удалось сохранить иконку в кэш {path}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+            over_limit = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._trim_disk(path.parent)
+
+    def _trim_disk(self, directory: Path):
+        """Удаляет давно не использованные иконки, пока папка не уложится в max_disk_bytes"""
+        files = []
+        for path in directory.glob("*.png"):
+            try:
+                stat = path.stat()
+            except OSError:  # файл удалил другой запуск
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def image(self, image_path: str, fg_color: str, bg_color: str = None) -> Image.Image:
+        """Перекрашенная иконка (см. recolor_icon); возвращаемое изображение общее, его нельзя изменять"""
+        stat = os.stat(image_path)
+        stamp = (os.fspath(image_path), stat.st_mtime_ns, stat.st_size)
+        key = (stamp, fg_color, bg_color)
+
+        image = self._lookup(self._images, key)
+        if image is not None:
+            return image
+        with self._lock:
+            self.misses += 1
+
+        disk_path = self._disk_path(stamp, fg_color, bg_color) if self.disk_dir else None
+        image = self._load_from_disk(disk_path) if disk_path and disk_path.exists() else None
+        if image is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            # Иконки категорий берутся из атласа, остальные читаются из файла
+            source = category_atlas.image_for_path(image_path)
+            image = recolor_icon(source if source is not None else image_path, fg_color, bg_color)
+            if disk_path:
+                self._save_to_disk(disk_path, image)
+
+        self._store(self._images, key, image)
+        return image
+
+    def ctk_image(self, image_path: str, fg_color: str, bg_color: str = None,
+                  size: tuple[int, int] = (40, 40)) -> ctk.CTkImage:
+        """CTkImage с перекрашенной иконкой; один объект можно показывать в нескольких виджетах"""
+        stat = os.stat(image_path)
+        key = (os.fspath(image_path), stat.st_mtime_ns, stat.st_size, fg_color, bg_color, tuple(size))
+
+        ctk_image = self._lookup(self._ctk_images, key)
+        if ctk_image is None:
+            ctk_image = ctk.CTkImage(light_image=self.image(image_path, fg_color, bg_color), size=size)
+            self._store(self._ctk_images, key, ctk_image)
+        return ctk_image
+
+    def clear(self, disk: bool = False):
+        with self._lock:
+            self._images.clear()
+            self._ctk_images.clear()
+            self._hashes.clear()
+        if disk and self.disk_dir and self.disk_dir.is_dir():
+            for path in self.disk_dir.glob("*.png"):
+                path.unlink(missing_ok=True)
+            with self._lock:
+                self._disk_bytes = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "images": len(self._images),
+                "ctk_images": len(self._ctk_images),
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+
+icon_cache = IconCache(disk_dir=default_cache_dir())
@@ -1,16 +1,43 @@
-import matplotlib.pyplot as plt
+import time
+_imports_started = time.perf_counter()
+
+import argparse
+import datetime
+import importlib
+import sys
+
 import customtkinter as ctk
 
 from category_creation import resource_path
 from sidebar import SideBar
-from main_page import MainPage
-from expenses_page import ExpensesPage
-from accounts_page import AccountsPage
-from transactions_page import TransactionsPage
-from settings_page import SettingsPage  # Добавляем импорт
+from query_executor import query_executor
+from db_management import prepare_database, refresh_balance_snapshots
+from icon_cache import icon_cache
+
+IMPORTS_SECONDS = time.perf_counter() - _imports_started
 
 class App(ctk.CTk):
-    def __init__(self):
+    # Модули страниц импортируются, а сами страницы создаются при первом показе, а не при запуске
+    # (новые модули нужно добавить и в hiddenimports в main.spec)
+    page_modules = {
+        "main": "main_page",
+        "expenses": "expenses_page",
+        "accounts": "accounts_page",
+        "transactions": "transactions_page",
+        "settings": "settings_page",
+    }
+    page_factories = {
+        "main": lambda app, module: module.MainPage(app.main_area),
+        "expenses": lambda app, module: module.ExpensesPage(app.main_area),
+        "accounts": lambda app, module: module.AccountsPage(app.main_area, app),
+        "transactions": lambda app, module: module.TransactionsPage(app.main_area),
+        "settings": lambda app, module: module.SettingsPage(app.main_area),
+    }
+    prewarm_delay = 500  # мс после показа окна, прежде чем создавать остальные страницы
+    snapshots_check_interval = 60 * 60 * 1000  # мс между проверками, не наступил ли новый месяц
+
+    def __init__(self, prewarm: bool = True, profile_startup: bool = False):
+        self.started_at = time.perf_counter()
         super().__init__()
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
@@ -33,41 +60,95 @@ class App(ctk.CTk):
         self.main_area.grid_columnconfigure(0, weight=1)
         self.main_area.grid(row=0, column=1, sticky="nsew")
 
-        self.pages = {
-            "main": MainPage(self.main_area),
-            "expenses": ExpensesPage(self.main_area),
-            "accounts": AccountsPage(self.main_area, self),
-            "transactions": TransactionsPage(self.main_area),
-            "settings": SettingsPage(self.main_area)  # Добавляем страницу настроек
-        }
+        # Схема БД готовится в фоне; запросы страниц дождутся её, не блокируя окно
+        query_executor.startup(prepare_database)
+        self.snapshots_month = datetime.date.today().replace(day=1)
+        self.after(self.snapshots_check_interval, self.check_balance_snapshots)
+
+        self.pages = {}
+        self.page_timings = {}  # название страницы -> (импорт модуля, создание, первая отрисовка), с
+        self.profile_startup = profile_startup
         self.show_page("main")
+        self.first_page_at = time.perf_counter()
+
+        # Отчёт выводится, когда созданы все страницы, которые будут созданы заранее
+        if prewarm:
+            self.after(self.prewarm_delay, self.prewarm_pages)
+        elif profile_startup:
+            self.after_idle(self.print_startup_report)
+
+    def get_page(self, page_name: str) -> ctk.CTkFrame:
+        if page_name not in self.pages:
+            started = time.perf_counter()
+            module = importlib.import_module(self.page_modules[page_name])
+            imported = time.perf_counter()
+            self.pages[page_name] = self.page_factories[page_name](self, module)
+            self.page_timings[page_name] = (imported - started, time.perf_counter() - imported, 0.0)
+        return self.pages[page_name]
 
     def show_page(self, page_name: str) -> None:
-        for page in self.pages.values():
-            page.grid_remove()
-        self.pages[page_name].grid(row=0, column=0, sticky="nsew")
-        self.pages[page_name].update_idletasks()
+        page = self.get_page(page_name)
+        for other in self.pages.values():
+            other.grid_remove()
+
+        started = time.perf_counter()
+        page.grid(row=0, column=0, sticky="nsew")
+        page.update_idletasks()
+        # Области, изменённые, пока страница была скрыта, перерисовываются при показе
+        if hasattr(page, 'refresh_dirty'):
+            page.refresh_dirty()
+
+        import_time, construction, render = self.page_timings[page_name]
+        if not render:
+            self.page_timings[page_name] = (import_time, construction, time.perf_counter() - started)
+
+    def prewarm_pages(self):
+        """Создаёт ещё не открытые страницы по одной, когда интерфейс простаивает"""
+        remaining = [name for name in self.page_factories if name not in self.pages]
+        if not remaining:
+            if self.profile_startup:
+                self.print_startup_report()
+            return
+        self.get_page(remaining[0])
+        self.after_idle(lambda: self.after(50, self.prewarm_pages))
+
+    def check_balance_snapshots(self):
+        """Если приложение не закрывали с прошлого месяца, делает снимки остатков на начало нового"""
+        month = datetime.date.today().replace(day=1)
+        if month != self.snapshots_month:
+            self.snapshots_month = month
+            query_executor.run_in_background(self, refresh_balance_snapshots, on_done=lambda result: None)
+        self.after(self.snapshots_check_interval, self.check_balance_snapshots)
+
+    def print_startup_report(self):
+        print(f"⏱ Импорт модулей приложения: {IMPORTS_SECONDS * 1000:.0f} мс")
+        print(f"⏱ Окно готово через {(self.first_page_at - self.started_at) * 1000:.0f} мс")
+        for name, (import_time, construction, render) in self.page_timings.items():
+            print(f"   {name:<13} импорт {import_time * 1000:7.1f} мс, создание {construction * 1000:7.1f} мс, "
+                  f"первая отрисовка {render * 1000:7.1f} мс")
+        loaded = [name for name in ("matplotlib", "numpy") if name in sys.modules]
+        print(f"   загружены при запуске: {', '.join(loaded) if loaded else 'без matplotlib и numpy'}")
+        icons = icon_cache.stats()
+        print(f"   иконки: {icons['misses']} перекрашено или прочитано из кэша на диске "
+              f"(из них с диска {icons['disk_hits']}), {icons['hits']} взято из памяти")
 
     def on_close(self):
-        plt.close('all')
+        query_executor.shutdown()
         self.quit()
         self.destroy()
 
-    def update_transactions(self):
-        for page in self.pages.values():
-            if hasattr(page, 'update_transactions'):
-                page.update_transactions()
-
-    def update_transfers(self):
-        self.pages["accounts"].update_transfers()
-        self.pages["transactions"].update_transfers()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Система учёта финансов")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="вывести время импорта модулей, создания и первой отрисовки страниц")
+    parser.add_argument("--no-prewarm", action="store_true",
+                        help="не создавать страницы заранее, только при первом открытии")
+    parser.add_argument("--no-icon-disk-cache", action="store_true",
+                        help="не сохранять перекрашенные иконки на диск между запусками")
+    args = parser.parse_args()
 
-    def update_categories(self):
-        """Метод для обновления категорий во всех страницах"""
-        for page in self.pages.values():
-            if hasattr(page, 'update_categories'):
-                page.update_categories()
+    if args.no_icon_disk_cache:
+        icon_cache.disk_dir = None
 
-if __name__ == '__main__':
-    app = App()
+    app = App(prewarm=not args.no_prewarm, profile_startup=args.profile_startup)
     app.mainloop()
\ No newline at end of file
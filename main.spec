@@ -25,6 +25,12 @@ a = Analysis(
         'matplotlib.backends.backend_tkagg',
         'numpy',
         'CustomTkinterMessagebox',  # если используете
+        # Страницы импортируются по имени модуля (App.page_modules), PyInstaller их сам не найдёт
+        'main_page',
+        'expenses_page',
+        'accounts_page',
+        'transactions_page',
+        'settings_page',
     ],
     hookspath=[],
     hooksconfig={},
@@ -2,11 +2,14 @@ import datetime
 from PIL import Image
 import customtkinter as ctk
 from customtkinter import CTkFrame
-from sqlalchemy import desc, func, cast, Date
 
-from db_management import session, CategoriesTable, TransactionsTable
+from db_management import get_recent_transactions
+from event_bus import event_bus, LazyRefreshMixin, date_in_period
 from pop_up_calendar import PopUpCalendar
-from addition_classes import MainPagePie, PeriodButtons, recolor_icon, resource_path
+from query_executor import query_executor
+from virtual_table import RecentRowsFrame
+from addition_classes import MainPagePie, PeriodButtons, resource_path, get_category_totals
+from icon_cache import icon_cache
 
 
 def change_background(image_path, bg_color, lines_color):
@@ -50,7 +53,7 @@ def close_calendar(main_page_instance):
             main_page_instance.stats_frame.show_in_date_label(main_page_instance)
 
 
-class CategoriesFrame(ctk.CTkScrollableFrame):
+class CategoriesFrame(RecentRowsFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
 
@@ -63,21 +66,25 @@ class CategoriesFrame(ctk.CTkScrollableFrame):
         self.update_frame()
 
     def update_frame(self):
-        for i, (cat, trans) in enumerate(session.query(CategoriesTable, TransactionsTable
-                                ).join(TransactionsTable, TransactionsTable.category_id == CategoriesTable.category_id
-                                ).order_by(desc(TransactionsTable.transaction_date_time)).all()):
-            image = ctk.CTkLabel(self, text="", image=ctk.CTkImage(light_image=recolor_icon(resource_path(
-                                 f"assets/{cat.icon_url}"), cat.colour),
-                size=(40, 40)))
-            image.grid(row=i, column=0, padx=(20, 10), pady=5, sticky="w")
+        query_executor.run_in_background(self, get_recent_transactions, None, self.limit,
+                                         on_done=self.apply_rows, key="transactions")
 
-            label = ctk.CTkLabel(self, text=cat.category_name, font=("Arial", 16),
-                                    text_color="black")
-            label.grid(row=i, column=1, padx=(10, 10), pady=5, sticky="nsew")
+    def row_key(self, trans):
+        return trans.transaction_id
 
-            amount = ctk.CTkLabel(self, text=f"{trans.amount:,.2f}", font=("Arial", 16),
-                                    text_color="black")
-            amount.grid(row=i, column=2, padx=(10, 20), pady=5, sticky="e")
+    def create_row(self, trans, i):
+        image = ctk.CTkLabel(self, text="", image=icon_cache.ctk_image(resource_path(
+                             f"assets/{trans.icon_url}"), trans.colour, size=(40, 40)))
+        image.grid(row=i, column=0, padx=(20, 10), pady=5, sticky="w")
+
+        label = ctk.CTkLabel(self, text=trans.category_name, font=("Arial", 16),
+                                text_color="black")
+        label.grid(row=i, column=1, padx=(10, 10), pady=5, sticky="nsew")
+
+        amount = ctk.CTkLabel(self, text=f"{trans.amount:,.2f}", font=("Arial", 16),
+                                text_color="black")
+        amount.grid(row=i, column=2, padx=(10, 20), pady=5, sticky="e")
+        return [image, label, amount]
 
 
 class StatsFrame(ctk.CTkFrame):
@@ -103,28 +110,8 @@ class StatsFrame(ctk.CTkFrame):
         self.show_in_date_label(master)
         self.date_label.grid(sticky="nsew", padx=20, pady=20)
 
-        self.results = (
-            session.query(
-                CategoriesTable.category_name,
-                CategoriesTable.icon_url,
-                CategoriesTable.colour,
-                func.sum(TransactionsTable.amount).label("total_amount")
-            )
-            .join(TransactionsTable, TransactionsTable.category_id == CategoriesTable.category_id)
-            .filter(
-                TransactionsTable.transaction_type == 'Расход',
-                TransactionsTable.transaction_date_time >=
-                                        datetime.datetime.now() - datetime.timedelta(days=self.days_delta)
-            )
-            .group_by(CategoriesTable.category_id)
-            .order_by(func.sum(TransactionsTable.amount).desc())
-        ).all()
-        categories_val = [row.total_amount for row in self.results]
-        categories_labels = [row.category_name for row in self.results]
-        categories_colors = [row.colour for row in self.results]
-
-
-        self.pie = MainPagePie(self, categories_val, categories_labels, categories_colors, "")
+        # Диаграмма заполняется в фоне, см. MainPage.update_chart
+        self.pie = MainPagePie(self, None, None, None, "")
         self.pie.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=20, pady=20)
 
     def show_in_date_label(self, master):
@@ -153,7 +140,7 @@ class StatsFrame(ctk.CTkFrame):
                      f"{master.transaction_date[1].year}")
 
 
-class MainPage(ctk.CTkFrame):
+class MainPage(LazyRefreshMixin, ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
 
@@ -178,27 +165,30 @@ class MainPage(ctk.CTkFrame):
         self.pop_up_calendar = PopUpCalendar(True)
         self.pop_up_calendar.withdraw()
 
+        self.update_chart(self.transaction_date)
+
+        self.init_lazy_refresh({
+            "chart": lambda: self.update_chart(self.transaction_date),
+            "recent": self.categories_frame.update_frame,
+        })
+        event_bus.subscribe("transaction", self.on_transaction_added)
+
+    def on_transaction_added(self, event):
+        # Диаграмма показывает расходы за выбранный период — доход или операция вне периода её не меняют
+        if event.transaction_type == "Расход" and date_in_period(event.date, self.transaction_date):
+            self.mark_dirty("recent", "chart")
+        else:
+            self.mark_dirty("recent")
+
     def update_chart(self, dates: list[datetime.date], period=None):
         date_from = dates[0]
         date_to = dates[1]
-        results = (
-            session.query(
-                CategoriesTable.category_name,
-                CategoriesTable.icon_url,
-                CategoriesTable.colour,
-                func.sum(TransactionsTable.amount).label("total_amount")
-            )
-            .join(TransactionsTable, TransactionsTable.category_id == CategoriesTable.category_id)
-            .filter(
-                TransactionsTable.transaction_type == 'Расход',
-                cast(TransactionsTable.transaction_date_time, Date) >= date_from,
-                cast(TransactionsTable.transaction_date_time, Date) <= date_to
-            )
-            .group_by(CategoriesTable.category_id)
-            .order_by(func.sum(TransactionsTable.amount).desc())
-            .all()
-        )
 
+        self.stats_frame.pie.show_loading()
+        query_executor.run_in_background(self, get_category_totals, date_from, date_to,
+                                         on_done=self.show_chart, key="chart")
+
+    def show_chart(self, results):
         values = [float(row.total_amount) for row in results] 
         labels = [row.category_name for row in results]
         colors = [row.colour for row in results]
@@ -212,7 +202,4 @@ class MainPage(ctk.CTkFrame):
         self.transaction_date = [today - datetime.timedelta(days=days), today]
         self.stats_frame.show_in_date_label(self)
 
-    def update_transactions(self):
-        self.update_chart(self.transaction_date, "Same")
-        self.categories_frame.update_frame()
 
@@ -0,0 +1,96 @@
+import functools
+import threading
+from collections import Counter, OrderedDict
+
+from sqlalchemy import event
+
+
+class QueryCache:
+    """
+    Общий LRU-кэш результатов запросов. Ключ — функция запроса и её аргументы.
+    У каждой таблицы есть счётчик версий: запись в кэше действительна, пока не изменилась
+    версия ни одной таблицы, из которых читает запрос. Пути записи увеличивают версии
+    изменённых таблиц после коммита (см. mark_changed)
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = Counter()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def bump(self, *tables: str):
+        """Увеличивает версии таблиц: закэшированные по ним результаты становятся недействительными"""
+        with self._lock:
+            self._versions.update(tables)
+
+    def get_or_run(self, tables: tuple, query_func, db_session, *args, **kwargs):
+        key = (query_func.__module__, query_func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+        # Версии запоминаются до запроса: если запись успеет закоммититься, пока он выполняется,
+        # результат сохранится со старыми версиями и при следующем обращении будет перечитан
+        with self._lock:
+            versions = tuple(self._versions[table] for table in tables)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = query_func(db_session, *args, **kwargs)
+
+        with self._lock:
+            self._entries[key] = (versions, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def cached(self, *tables: str):
+        """Декоратор для функций запросов вида query_func(db_session, *args), читающих из tables"""
+        def decorator(query_func):
+            @functools.wraps(query_func)
+            def wrapper(db_session, *args, **kwargs):
+                return self.get_or_run(tables, query_func, db_session, *args, **kwargs)
+            wrapper.uncached = query_func
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+
+def mark_changed(db_session, *tables: str):
+    """
+    Отмечает таблицы, изменённые в текущей транзакции сессии.
+    Их версии увеличиваются после коммита, при откате отметки сбрасываются
+    """
+    db_session.info.setdefault("changed_tables", set()).update(tables)
+
+
+def track_commits(session_factory):
+    """Подключает к фабрике сессий обновление версий таблиц из mark_changed после коммита"""
+    @event.listens_for(session_factory, "after_commit")
+    def bump_changed_tables(db_session):
+        query_cache.bump(*db_session.info.pop("changed_tables", ()))
+
+    @event.listens_for(session_factory, "after_rollback")
+    def forget_changed_tables(db_session):
+        db_session.info.pop("changed_tables", None)
+
+
+query_cache = QueryCache()
@@ -0,0 +1,79 @@
+import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from db_management import Session
+
+
+class QueryExecutor:
+    """
+    Выполняет запросы к БД в фоновых потоках, чтобы не блокировать главный цикл Tk.
+    Каждая задача получает собственную сессию, результат передаётся в интерфейс через after()
+    """
+    poll_interval = 30  # мс
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-query")
+        self._generations = {}
+        self._startup = None
+
+    def startup(self, task, *args) -> Future:
+        """
+        Запускает task(*args) в фоновом потоке (например, prepare_database).
+        Запросы ждут его завершения, а если он завершился ошибкой, получают эту ошибку
+        """
+        self._startup = self._pool.submit(task, *args)
+        return self._startup
+
+    def _run(self, query_func, args):
+        if self._startup is not None:
+            self._startup.result()
+        with Session() as db_session:
+            return query_func(db_session, *args)
+
+    def submit(self, query_func, *args) -> Future:
+        """Запускает query_func(db_session, *args) в фоновом потоке"""
+        return self._pool.submit(self._run, query_func, args)
+
+    def run_in_background(self, widget, query_func, *args, on_done, on_error=None, key: str = None) -> Future:
+        """
+        Запускает запрос и вызывает on_done(result) в главном потоке, когда он завершится.
+        Если задан key, результат применяется только для последнего запроса с этим ключом
+        у данного виджета: устаревшие ответы (например, при быстром переключении периода) отбрасываются
+        """
+        future = self.submit(query_func, *args)
+
+        token = generation = None
+        if key is not None:
+            token = (str(widget), key)
+            generation = self._generations.get(token, 0) + 1
+            self._generations[token] = generation
+
+        def check():
+            try:
+                if not widget.winfo_exists():
+                    return
+            except tk.TclError:
+                return
+
+            if not future.done():
+                widget.after(self.poll_interval, check)
+                return
+            if token is not None and self._generations.get(token) != generation:
+                return
+
+            error = future.exception()
+            if error is None:
+                on_done(future.result())
+            elif on_error is not None:
+                on_error(error)
+            else:
+                print(f"❌ Ошибка запроса к базе данных: {error}")
+
+        widget.after(self.poll_interval, check)
+        return future
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+query_executor = QueryExecutor()
@@ -6,10 +6,12 @@ from pathlib import Path
 import customtkinter as ctk
 from CustomTkinterMessagebox import CTkMessagebox
 from sqlalchemy import func
-from PIL import Image
 
-from db_management import session, CategoriesTable
-from addition_classes import recolor_icon, resource_path
+from db_management import Session, CategoriesTable
+from event_bus import event_bus, LazyRefreshMixin
+from icon_cache import icon_cache
+from icon_atlas import category_atlas
+from addition_classes import resource_path
 from category_creation import CategoryCreationPage, get_icon_names
 
 class IconsManagementFrame(ctk.CTkFrame):
@@ -72,8 +74,7 @@ class IconsManagementFrame(ctk.CTkFrame):
             no_icons_label.grid(row=0, column=0, padx=20, pady=20, sticky="w")
             return
         
-        icons = [f for f in os.listdir(icons_path) if f.endswith('.png')]
-        icons.sort()
+        icons = category_atlas.names()
         
         if not icons:
             no_icons_label = ctk.CTkLabel(self.icons_preview_frame, 
@@ -84,11 +85,10 @@ class IconsManagementFrame(ctk.CTkFrame):
         
         # Отображаем ВСЕ иконки с полными названиями
         columns = 6  # Немного уменьшим количество колонок для более широких ячеек
-        for i, icon_file in enumerate(icons):
+        for i, icon_name in enumerate(icons):
             row = i // columns
             col = i % columns
             
-            icon_path = os.path.join(icons_path, icon_file)
             try:
                 # Создаем контейнер для иконки и названия
                 icon_container = ctk.CTkFrame(self.icons_preview_frame, fg_color="transparent", height=80)
@@ -96,9 +96,9 @@ class IconsManagementFrame(ctk.CTkFrame):
                 icon_container.grid_propagate(False)
                 icon_container.grid_columnconfigure(0, weight=1)
                 
-                # Загружаем иконку
+                # Иконка из атласа: все иконки декодируются один раз
                 icon_image = ctk.CTkImage(
-                    light_image=Image.open(icon_path),
+                    light_image=category_atlas.image(icon_name),
                     size=(40, 40)
                 )
                 
@@ -107,7 +107,6 @@ class IconsManagementFrame(ctk.CTkFrame):
                 icon_label.grid(row=0, column=0, pady=(5, 2))
                 
                 # Полное название иконки с переносом слов
-                icon_name = icon_file.replace('.png', '')
                 name_label = ctk.CTkLabel(icon_container, text=icon_name,
                                         font=("Arial", 9), text_color="black",
                                         wraplength=80,  # Ширина для переноса
@@ -115,7 +114,7 @@ class IconsManagementFrame(ctk.CTkFrame):
                 name_label.grid(row=1, column=0, pady=(0, 5), sticky="ew")
                 
             except Exception as e:
-                print(f"Ошибка загрузки иконки {icon_file}: {e}")
+                print(f"Ошибка загрузки иконки {icon_name}: {e}")
                 continue
         
         # Обновляем информацию о количестве
@@ -280,6 +279,8 @@ class IconsManagementFrame(ctk.CTkFrame):
                     dst_path = os.path.join(icons_dir, file)
                     shutil.copy2(src_path, dst_path)
 
+        category_atlas.invalidate()
+
 class CategoriesManagementFrame(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
@@ -332,8 +333,9 @@ class CategoriesManagementFrame(ctk.CTkFrame):
             widget.destroy()
         
         # Получаем все категории из базы данных
-        categories = session.query(CategoriesTable).order_by(CategoriesTable.transaction_type, 
-                                                           CategoriesTable.category_name).all()
+        with Session() as db_session:
+            categories = db_session.query(CategoriesTable).order_by(CategoriesTable.transaction_type,
+                                                                    CategoriesTable.category_name).all()
         
         if not categories:
             no_categories_label = ctk.CTkLabel(self.categories_frame, 
@@ -377,10 +379,8 @@ class CategoriesManagementFrame(ctk.CTkFrame):
         category_frame.grid_columnconfigure(2, weight=0)
         
         # Иконка категории
-        icon_image = ctk.CTkImage(
-            light_image=recolor_icon(resource_path(f"assets/{category.icon_url}"), category.colour),
-            size=(40, 40)
-        )
+        icon_image = icon_cache.ctk_image(resource_path(f"assets/{category.icon_url}"), category.colour,
+                                          size=(40, 40))
         icon_label = ctk.CTkLabel(category_frame, image=icon_image, text="")
         icon_label.grid(row=0, column=0, padx=(10, 5), pady=5)
         
@@ -395,7 +395,7 @@ class CategoriesManagementFrame(ctk.CTkFrame):
                                 font=("Arial", 12), text_color="black")
         type_label.grid(row=0, column=2, padx=5, pady=5, sticky="e")
 
-class SettingsPage(ctk.CTkFrame):
+class SettingsPage(LazyRefreshMixin, ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         
@@ -425,6 +425,5 @@ class SettingsPage(ctk.CTkFrame):
         self.icons_management = IconsManagementFrame(self.tabview.tab("Иконки"))
         self.icons_management.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
 
-    def update_categories(self):
-        """Метод для обновления списка категорий"""
-        self.categories_management.update_categories_list()
\ No newline at end of file
+        self.init_lazy_refresh({"categories": self.categories_management.update_categories_list})
+        event_bus.subscribe("category", lambda event: self.mark_dirty("categories"))
\ No newline at end of file
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 
-from addition_classes import recolor_icon, app_color, resource_path
+from addition_classes import app_color, resource_path
+from icon_cache import icon_cache
 from transaction_creation import NewTransactionWindow
 
 class SideBar(ctk.CTkFrame):
@@ -13,38 +14,38 @@ class SideBar(ctk.CTkFrame):
         self.height = 60
 
         self.main_button = ctk.CTkButton(self, width=self.width, height=self.height, text="", command=lambda: show_function("main"),
-            image=(ctk.CTkImage(light_image=recolor_icon(resource_path("assets/icons/sidebar/house.png"),
-                                                                app_color["light_blue"]), size=(40,40))))
+            image=icon_cache.ctk_image(resource_path("assets/icons/sidebar/house.png"),
+                                       app_color["light_blue"], size=(40, 40)))
         self.main_button.grid(row=0, column=0, padx=20, pady=20, sticky="we")
 
         self.expenses_button = ctk.CTkButton(self, width=self.width, height=self.height, text="", command=lambda: show_function("expenses"),
-            image=(ctk.CTkImage(light_image=recolor_icon(resource_path(
-                "assets/icons/sidebar/money-transaction.png"), app_color["light_blue"]), size=(40,40))))
+            image=icon_cache.ctk_image(resource_path(
+                "assets/icons/sidebar/money-transaction.png"), app_color["light_blue"], size=(40, 40)))
         self.expenses_button.grid(row=1, column=0, padx=20, pady=20, sticky="we")
 
         self.accounts_button = ctk.CTkButton(self, width=self.width, height=self.height, text="", command=lambda: show_function("accounts"),
-            image=(ctk.CTkImage(light_image=recolor_icon(resource_path(
-                "assets/icons/sidebar/credit-card.png"), app_color["light_blue"]), size=(40,40))))
+            image=icon_cache.ctk_image(resource_path(
+                "assets/icons/sidebar/credit-card.png"), app_color["light_blue"], size=(40, 40)))
         self.accounts_button.grid(row=2, column=0, padx=20, pady=20, sticky="we")
 
         self.transactions_button = ctk.CTkButton(self, width=self.width, height=self.height, text="",
                                             command=lambda: show_function("transactions"),
-            image=(ctk.CTkImage(light_image=recolor_icon(resource_path(
-                "assets/icons/sidebar/currency.png"), app_color["light_blue"]), size=(40, 40))))
+            image=icon_cache.ctk_image(resource_path(
+                "assets/icons/sidebar/currency.png"), app_color["light_blue"], size=(40, 40)))
         self.transactions_button.grid(row=3, column=0, padx=20, pady=20, sticky="we")
 
         # Новая кнопка настроек
         self.settings_button = ctk.CTkButton(self, width=self.width, height=self.height, text="", 
                                             command=lambda: show_function("settings"),
-            image=(ctk.CTkImage(light_image=recolor_icon(resource_path(
-                "assets/icons/sidebar/settings.png"), app_color["light_blue"]), size=(40, 40))))
+            image=icon_cache.ctk_image(resource_path(
+                "assets/icons/sidebar/settings.png"), app_color["light_blue"], size=(40, 40)))
         self.settings_button.grid(row=4, column=0, padx=20, pady=20, sticky="we")
 
         self.plus_button = ctk.CTkButton(self, width=self.width, height=self.height, text="",
                                          command=self.open_new_transaction,
-                                         image=(ctk.CTkImage(light_image=recolor_icon(
+                                         image=icon_cache.ctk_image(
                                              resource_path("assets/icons/sidebar/add.png"),
-                                                app_color["light_blue"]), size=(40, 40))))
+                                             app_color["light_blue"], size=(40, 40)))
         self.plus_button.grid(row=5, column=0, padx=20, pady=20, sticky="swe")
 
         self.new_transaction = None
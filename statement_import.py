@@ -0,0 +1,326 @@
+"""
+Импорт банковских выписок (CSV и OFX) пачками.
+
+Файл читается потоково, строки сопоставляются со счетами и категориями
+и вставляются пачками: через COPY в PostgreSQL и executemany в остальных БД.
+Баланс каждого затронутого счёта, дневные итоги и снимки остатков обновляются один раз на пачку.
+
+Использование:
+    python statement_import.py выписка.csv --account "Основная карта" [--category "Прочее"]
+"""
+import argparse
+import csv
+import datetime
+import io
+import re
+import time
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from sqlalchemy import insert
+
+from db_management import (Session, AccountsTable, CategoriesTable, TransactionsTable,
+                           add_daily_totals_batch, add_to_balance_snapshots, change_account_balances,
+                           prepare_database)
+from query_cache import mark_changed
+
+BATCH_SIZE = 5000
+
+# Возможные названия колонок CSV для каждого поля
+CSV_COLUMNS = {
+    "date": ("date", "дата", "дата операции", "дата и время"),
+    "amount": ("amount", "сумма", "сумма операции"),
+    "type": ("type", "тип"),
+    "account": ("account", "счёт", "счет"),
+    "category": ("category", "категория"),
+    "description": ("description", "описание", "комментарий", "memo"),
+}
+
+# Значения колонки с типом операции, которые встречаются в выписках; в БД попадают только "Расход" и "Доход"
+TRANSACTION_TYPES = {
+    "расход": "Расход", "списание": "Расход", "покупка": "Расход", "оплата": "Расход",
+    "expense": "Расход", "debit": "Расход", "withdrawal": "Расход", "payment": "Расход",
+    "доход": "Доход", "зачисление": "Доход", "пополнение": "Доход", "поступление": "Доход",
+    "income": "Доход", "credit": "Доход", "deposit": "Доход",
+}
+
+DATE_FORMATS = ("%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y", "%Y%m%d%H%M%S", "%Y%m%d")
+# Самый частый формат в выписках разбирается без strptime — он заметно медленнее
+RUSSIAN_DATE = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})(?:[ T](\d{2}):(\d{2})(?::(\d{2}))?)?$")
+
+
+class StatementRow(NamedTuple):
+    date_time: datetime.datetime
+    amount: Decimal
+    transaction_type: str
+    account: str | None
+    category: str | None
+    description: str
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    skipped: int
+    seconds: float
+
+
+def parse_date(text: str) -> datetime.datetime:
+    text = text.strip()
+    match = RUSSIAN_DATE.match(text)
+    if match:
+        day, month, year, hour, minute, second = match.groups()
+        return datetime.datetime(int(year), int(month), int(day),
+                                 int(hour or 0), int(minute or 0), int(second or 0))
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"Неизвестный формат даты: {text}")
+
+
+def parse_amount(text: str) -> Decimal:
+    # "1 234,56" и "-1234.56" — оба варианта встречаются в выписках
+    return Decimal(text.strip().replace("\xa0", "").replace(" ", "").replace(",", "."))
+
+
+def parse_type(text: str, amount: Decimal) -> str:
+    """Тип операции по значению из выписки, а если его нет — по знаку суммы"""
+    text = text.strip().lower()
+    if not text:
+        return "Расход" if amount < 0 else "Доход"
+    try:
+        return TRANSACTION_TYPES[text]
+    except KeyError:
+        raise ValueError(f"Неизвестный тип операции: {text}") from None
+
+
+def iter_csv_rows(path: str | Path, skipped: list) -> Iterator[StatementRow]:
+    """
+    Читает CSV построчно. Знак суммы определяет тип операции, если нет колонки с типом;
+    строки с неизвестным типом пропускаются
+    """
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        sample = file.read(4096)
+        file.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        reader = csv.reader(file, dialect)
+
+        header = [name.strip().lower() for name in next(reader)]
+        columns = {}
+        for field, aliases in CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in header:
+                    columns[field] = header.index(alias)
+                    break
+        if "date" not in columns or "amount" not in columns:
+            raise ValueError("В CSV нет колонок с датой и суммой")
+
+        def get(row, field):
+            index = columns.get(field)
+            return row[index].strip() if index is not None and index < len(row) else ""
+
+        for row in reader:
+            try:
+                amount = parse_amount(get(row, "amount"))
+                transaction_type = parse_type(get(row, "type"), amount)
+                yield StatementRow(parse_date(get(row, "date")), abs(amount), transaction_type,
+                                   get(row, "account") or None, get(row, "category") or None,
+                                   get(row, "description"))
+            except (ValueError, InvalidOperation, IndexError):
+                skipped[0] += 1
+
+
+OFX_TAG = re.compile(r"<(/?)([A-Z0-9.]+)>([^<]*)", re.IGNORECASE)
+
+
+def iter_ofx_rows(path: str | Path, skipped: list, chunk_size: int = 1 << 16) -> Iterator[StatementRow]:
+    """
+    Читает OFX (SGML или XML) кусками и выдаёт операции из блоков <STMTTRN>.
+    Закрывающие теги необязательны, как и принято в OFX 1.x.
+    Счёт строк не заполняется: в OFX это номер счёта в банке (ACCTID), а не название счёта в приложении,
+    поэтому операции зачисляются на счёт, указанный при импорте
+    """
+    transaction = None
+
+    def finish(fields):
+        try:
+            amount = parse_amount(fields["TRNAMT"])
+            return StatementRow(parse_date(fields["DTPOSTED"][:14]), abs(amount),
+                                "Расход" if amount < 0 else "Доход", None, None,
+                                fields.get("MEMO") or fields.get("NAME", ""))
+        except (KeyError, ValueError, InvalidOperation):
+            skipped[0] += 1
+            return None
+
+    with open(path, encoding="utf-8", errors="replace") as file:
+        tail = ""
+        while True:
+            chunk = file.read(chunk_size)
+            data = tail + chunk
+            # Последний тег может быть разрезан границей куска — оставляем его на следующий раз
+            cut = data.rfind("<") if chunk else len(data)
+            tail, data = data[cut:], data[:cut]
+
+            for closing, tag, value in OFX_TAG.findall(data):
+                tag = tag.upper()
+                value = value.strip()
+                if tag == "STMTTRN":
+                    if transaction is not None:
+                        row = finish(transaction)
+                        if row:
+                            yield row
+                    transaction = None if closing else {}
+                elif transaction is not None and not closing and value:
+                    transaction[tag] = value
+
+            if not chunk:
+                break
+
+    if transaction is not None:
+        row = finish(transaction)
+        if row:
+            yield row
+
+
+def _batches(rows: Iterator[StatementRow], size: int) -> Iterator[list[StatementRow]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy_transactions(db_session, records: list[dict]):
+    """Вставка пачки через COPY ... FROM STDIN (PostgreSQL) в рамках текущей транзакции сессии"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow((record["account_id"], record["category_id"] if record["category_id"] is not None else "",
+                         record["transaction_type"], record["transaction_date_time"].isoformat(sep=" "),
+                         record["amount"], record["description"]))
+    buffer.seek(0)
+
+    cursor = db_session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY transactions (account_id, category_id, transaction_type, transaction_date_time, amount, description) "
+            "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (description))", buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_batch(db_session, batch: list[StatementRow], accounts: dict, categories: dict,
+                  default_account_id: int, default_category: str | None, skipped: list) -> int:
+    """
+    Вставляет пачку строк. Строки со счётом, которого нет в БД, и с категорией другого типа
+    (например, доход с категорией расходов) пропускаются и учитываются в skipped
+    """
+    records = []
+    balance_changes = defaultdict(Decimal)
+    daily_balance_changes = defaultdict(Decimal)
+    daily_totals = defaultdict(lambda: (Decimal(0), 0))
+
+    for row in batch:
+        account_id = accounts.get(row.account) if row.account else default_account_id
+        category_id, category_type = categories.get(row.category, (None, None))
+        if account_id is None or category_type not in (None, row.transaction_type):
+            skipped[0] += 1
+            continue
+        if category_id is None:
+            # Категория не указана или не найдена — категория по умолчанию, если она того же типа
+            category_id, category_type = categories.get(default_category, (None, None))
+            if category_type != row.transaction_type:
+                category_id = None
+
+        records.append({
+            "account_id": account_id,
+            "category_id": category_id,
+            "transaction_type": row.transaction_type,
+            "transaction_date_time": row.date_time,
+            "amount": row.amount,
+            "description": row.description,
+        })
+
+        delta = -row.amount if row.transaction_type == "Расход" else row.amount
+        balance_changes[account_id] += delta
+        daily_balance_changes[account_id, row.date_time.date()] += delta
+        if category_id is not None:
+            key = (row.date_time.date(), category_id, row.transaction_type)
+            amount, count = daily_totals[key]
+            daily_totals[key] = (amount + row.amount, count + 1)
+
+    if not records:
+        return 0
+    if db_session.get_bind().dialect.name == "postgresql":
+        _copy_transactions(db_session, records)
+    else:
+        db_session.connection().execute(insert(TransactionsTable), records)
+
+    # Один UPDATE на каждый затронутый счёт за всю пачку
+    change_account_balances(db_session, balance_changes)
+    add_daily_totals_batch(db_session, daily_totals)
+    add_to_balance_snapshots(db_session, [
+        (account_id, datetime.datetime.combine(day, datetime.time.min), delta)
+        for (account_id, day), delta in daily_balance_changes.items()
+    ])
+    mark_changed(db_session, "transactions", "accounts", "daily_category_totals", "account_balance_snapshots")
+    return len(records)
+
+
+def import_statement(db_session, path: str | Path, default_account: str, default_category: str = None,
+                     batch_size: int = BATCH_SIZE) -> ImportResult:
+    """
+    Импортирует выписку в БД. Счёт и категория строки ищутся по названию.
+    Строки без счёта зачисляются на default_account, строки со счётом, которого нет в БД, пропускаются.
+    Строкам без категории или с неизвестной категорией назначается default_category, если она того же типа
+    (расход или доход), иначе они остаются без категории; строки с категорией другого типа пропускаются.
+    Каждая пачка фиксируется отдельной транзакцией БД
+    """
+    started = time.perf_counter()
+    path = Path(path)
+
+    accounts = dict(db_session.query(AccountsTable.description, AccountsTable.account_id).all())
+    categories = {name: (category_id, transaction_type) for name, category_id, transaction_type in
+                  db_session.query(CategoriesTable.category_name, CategoriesTable.category_id,
+                                   CategoriesTable.transaction_type)}
+    if default_account not in accounts:
+        raise ValueError(f"Счёт «{default_account}» не найден")
+    if default_category is not None and default_category not in categories:
+        raise ValueError(f"Категория «{default_category}» не найдена")
+
+    skipped = [0]
+    rows = iter_ofx_rows(path, skipped) if path.suffix.lower() in (".ofx", ".qfx") else iter_csv_rows(path, skipped)
+
+    imported = 0
+    for batch in _batches(rows, batch_size):
+        imported += _insert_batch(db_session, batch, accounts, categories,
+                                  accounts[default_account], default_category, skipped)
+        db_session.commit()
+
+    return ImportResult(imported, skipped[0], time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Импорт банковской выписки (CSV или OFX)")
+    parser.add_argument("path", help="файл выписки")
+    parser.add_argument("--account", required=True, help="счёт для строк без указанного счёта")
+    parser.add_argument("--category", help="категория для строк без указанной категории")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="размер пачки")
+    args = parser.parse_args()
+
+    prepare_database()
+    with Session() as db_session:
+        result = import_statement(db_session, args.path, args.account, args.category, args.batch_size)
+
+    print(f"✅ Импортировано: {result.imported}, пропущено: {result.skipped}, "
+          f"{result.imported / max(result.seconds, 1e-9):,.0f} строк/с")
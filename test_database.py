@@ -0,0 +1,381 @@
+"""
+Проверки работы с БД на SQLite в памяти: индексы и планы запросов за период, число запросов и постраничная выборка истории,
+импорт выписок, остатки счетов, сброс кэша запросов после коммита, параллельная запись.
+
+Запуск:
+    python -m pytest test_database.py
+
+Параллельная запись проверяется и на PostgreSQL, если в FINANCE_TEST_POSTGRES_URL задана строка подключения
+к пустой тестовой БД (её таблицы пересоздаются): в SQLite запись блокирует всю БД,
+и только PostgreSQL проверяет порядок блокировок строк счетов
+"""
+import datetime
+import os
+import random
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, func, insert, inspect, select, text
+from sqlalchemy.exc import OperationalError
+
+from db_management import (AccountBalanceSnapshotsTable, AccountsTable, Base, CategoriesTable,
+                           DailyCategoryTotalsTable, TransactionsTable, TransfersTable, configure_engine,
+                           ensure_balance_snapshots, get_accounts, get_balances, get_transactions_history,
+                           get_recent_transactions, get_transfers_history, period_range, prepare_database,
+                           save_transaction, save_transfer, session_scope)
+from query_cache import query_cache
+from statement_import import import_statement
+
+START = datetime.datetime(2025, 3, 1, 12, 0)
+
+
+@pytest.fixture
+def engine():
+    engine = configure_engine("sqlite://")
+    prepare_database(engine)
+    query_cache.clear()
+    with engine.begin() as connection:
+        connection.execute(insert(AccountsTable), [
+            {"type": "Обычный", "amount": 1000, "icon_url": "icons/card.png", "description": "Основная карта"},
+            {"type": "Обычный", "amount": 0, "icon_url": "icons/card.png", "description": "Накопления"},
+        ])
+        connection.execute(insert(CategoriesTable), [
+            {"category_name": "Продукты", "transaction_type": "Расход", "icon_url": "icons/categories/food.png"},
+            {"category_name": "Зарплата", "transaction_type": "Доход", "icon_url": "icons/categories/food.png"},
+        ])
+    yield engine
+    query_cache.clear()
+    engine.dispose()
+
+
+def add_synthetic_transactions(engine, rows: int, accounts: int = 2, days: int = 365):
+    """Случайные транзакции по счетам 1..accounts и категориям 1–2 за days дней до START"""
+    rnd = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(insert(TransactionsTable), [
+            {"account_id": rnd.randint(1, accounts), "category_id": rnd.randint(1, 2),
+             "transaction_type": "Расход" if rnd.random() < 0.8 else "Доход",
+             "transaction_date_time": START - datetime.timedelta(seconds=rnd.randint(0, days * 86400)),
+             "amount": round(rnd.uniform(10, 5000), 2), "description": ""}
+            for _ in range(rows)
+        ])
+
+
+def query_plan(engine, statement) -> str:
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        return "\n".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+
+
+def signed(transaction_type: str, amount) -> Decimal:
+    return -Decimal(amount) if transaction_type == "Расход" else Decimal(amount)
+
+
+def balance(account: str) -> Decimal:
+    with session_scope() as db_session:
+        return next(Decimal(row.amount) for row in get_accounts(db_session) if row.description == account)
+
+
+def read_pages(query, key, page_size: int) -> list:
+    rows, after = [], None
+    with session_scope() as db_session:
+        while True:
+            page = query(db_session, after, page_size)
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            after = key(page[-1])
+
+
+def test_prepare_database_adds_indexes_to_existing_tables():
+    # БД, созданная до появления индексов: таблицы есть, индексов нет
+    engine = configure_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for index in inspect(connection).get_indexes("transactions"):
+            connection.execute(text(f"DROP INDEX {index['name']}"))
+        assert inspect(connection).get_indexes("transactions") == []
+
+    prepare_database(engine)
+    names = {index["name"] for index in inspect(engine).get_indexes("transactions")}
+    assert {"ix_transactions_type_date_category", "ix_transactions_account_date",
+            "ix_transactions_date_id"} <= names
+    engine.dispose()
+
+
+def test_period_queries_use_indexes(engine):
+    with engine.begin() as connection:
+        connection.execute(insert(AccountsTable), [
+            {"type": "Обычный", "amount": 0, "icon_url": "icons/card.png", "description": f"Счёт {i}"}
+            for i in range(8)
+        ])
+    add_synthetic_transactions(engine, 20000, accounts=10)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+    date_from, date_to = START.date() - datetime.timedelta(days=6), START.date()
+    expenses_by_category = (
+        select(TransactionsTable.category_id, func.sum(TransactionsTable.amount))
+        .where(TransactionsTable.transaction_type == "Расход",
+               period_range(TransactionsTable.transaction_date_time, date_from, date_to))
+        .group_by(TransactionsTable.category_id)
+    )
+    account_history = (
+        select(TransactionsTable.transaction_id, TransactionsTable.amount)
+        .where(TransactionsTable.account_id == 1,
+               period_range(TransactionsTable.transaction_date_time, date_from, date_to))
+        .order_by(TransactionsTable.transaction_date_time.desc())
+    )
+
+    assert "ix_transactions_type_date_category" in query_plan(engine, expenses_by_category)
+    assert "ix_transactions_account_date" in query_plan(engine, account_history)
+
+
+@pytest.mark.parametrize("rows", [10, 500])
+def test_history_query_count_does_not_depend_on_rows(engine, rows):
+    add_synthetic_transactions(engine, rows)
+    with engine.begin() as connection:
+        connection.execute(insert(TransfersTable), [
+            {"from_account": 1, "to_account": 2, "transfer_date_time": START - datetime.timedelta(hours=i),
+             "amount": 1, "description": ""}
+            for i in range(rows // 10)
+        ])
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with session_scope() as db_session:
+        transactions = get_transactions_history(db_session)
+        transfers = get_transfers_history(db_session)
+        # Все поля, которые показывает страница истории, загружены теми же двумя запросами
+        for row in transactions:
+            (row.account_icon_url, row.category_name, row.colour, row.has_receipt)
+        for row in transfers:
+            (row.from_icon_url, row.to_icon_url)
+
+    assert (len(transactions), len(transfers)) == (rows, rows // 10)
+    assert len(statements) == 2
+
+
+def test_history_pages_return_each_row_once(engine):
+    # Много операций с одинаковым временем: граница страницы часто приходится внутрь такой группы
+    with engine.begin() as connection:
+        connection.execute(insert(TransactionsTable), [
+            {"account_id": 1, "category_id": 1, "transaction_type": "Расход",
+             "transaction_date_time": START + datetime.timedelta(minutes=i // 7), "amount": 1, "description": ""}
+            for i in range(250)
+        ])
+        connection.execute(insert(TransfersTable), [
+            {"from_account": 1, "to_account": 2, "transfer_date_time": START + datetime.timedelta(minutes=i // 5),
+             "amount": 1, "description": ""}
+            for i in range(90)
+        ])
+
+    transactions = read_pages(get_transactions_history,
+                              lambda row: (row.transaction_date_time, row.transaction_id), page_size=37)
+    ids = [row.transaction_id for row in transactions]
+    assert sorted(ids) == list(range(1, 251))
+    keys = [(row.transaction_date_time, row.transaction_id) for row in transactions]
+    assert keys == sorted(keys, reverse=True)
+
+    transfers = read_pages(get_transfers_history,
+                           lambda row: (row.transfer_date_time, row.transfer_id), page_size=10)
+    assert sorted(row.transfer_id for row in transfers) == list(range(1, 91))
+
+
+def test_import_keeps_balances_and_daily_totals_consistent(engine, tmp_path):
+    statement = tmp_path / "выписка.csv"
+    statement.write_text(
+        "Дата;Сумма;Тип;Счёт;Категория;Описание\n"
+        "01.03.2025 10:00;-120,50;;;Продукты;магазин\n"
+        "01.03.2025 18:30;80;Списание;;Продукты;рынок\n"
+        "02.03.2025;50 000;Зачисление;;Зарплата;аванс\n"
+        "03.03.2025;15;expense;;;без категории — категория по умолчанию\n"
+        "03.03.2025;10;Доход;Накопления;Зарплата;на другой счёт\n"
+        "06.03.2025;5;;;Неизвестная;доход, категория по умолчанию другого типа\n"
+        "04.03.2025;10;Неизвестно;;Продукты;пропускается: тип\n"
+        "не дата;10;;;Продукты;пропускается: дата\n"
+        "05.03.2025;100;Доход;;Продукты;пропускается: категория расходов\n"
+        "05.03.2025;-100;;Чужой счёт;Продукты;пропускается: счёта нет в БД\n",
+        encoding="utf-8")
+
+    with session_scope() as db_session:
+        result = import_statement(db_session, statement, "Основная карта", "Продукты", batch_size=2)
+    assert (result.imported, result.skipped) == (6, 4)
+
+    with session_scope() as db_session:
+        rows = db_session.execute(select(TransactionsTable.account_id, TransactionsTable.transaction_type,
+                                         TransactionsTable.amount, TransactionsTable.transaction_date_time,
+                                         TransactionsTable.category_id, CategoriesTable.transaction_type)
+                                  .outerjoin(CategoriesTable).order_by(TransactionsTable.transaction_id)).all()
+        assert {row[1] for row in rows} == {"Расход", "Доход"}
+        assert all(category_type in (None, transaction_type)
+                   for _, transaction_type, _, _, _, category_type in rows)
+        assert [row.category_id for row in rows] == [1, 1, 2, 1, 2, None]
+        assert balance("Основная карта") == Decimal(1000) + sum(signed(row[1], row[2]) for row in rows
+                                                                if row.account_id == 1)
+        assert balance("Основная карта") == Decimal("50789.50")
+        assert balance("Накопления") == Decimal(10)
+
+        # Дневные итоги совпадают с итогами, посчитанными по самим транзакциям
+        expected = defaultdict(lambda: [Decimal(0), 0])
+        for _, transaction_type, amount, date_time, category_id, _ in rows:
+            if category_id is not None:
+                total = expected[date_time.date(), category_id, transaction_type]
+                total[0] += Decimal(amount)
+                total[1] += 1
+        stored = {(row.day, row.category_id, row.transaction_type): [Decimal(row.total_amount),
+                                                                       row.transactions_count]
+                  for row in db_session.query(DailyCategoryTotalsTable)}
+        assert stored == dict(expected)
+
+        # Остаток на начало дня — начальный остаток и операции до этого дня
+        assert get_balances(db_session, datetime.date(2025, 3, 2))[1] == Decimal("799.50")
+        assert get_balances(db_session, datetime.date(2025, 3, 3))[1] == Decimal("50799.50")
+
+        # Снимки остатков не меняют ни текущих, ни прошлых остатков
+        ensure_balance_snapshots(db_session, datetime.date(2025, 6, 15))
+    assert balance("Основная карта") == Decimal("50789.50")
+    with session_scope() as db_session:
+        assert get_balances(db_session, datetime.date(2025, 3, 2))[1] == Decimal("799.50")
+        assert get_balances(db_session, datetime.date(2025, 5, 1))[1] == Decimal("50789.50")
+
+
+def test_account_added_after_start_keeps_its_amount(engine):
+    with session_scope() as db_session:
+        db_session.add(AccountsTable(type="Обычный", amount=100, icon_url="icons/card.png", description="Новый"))
+    assert balance("Новый") == Decimal(100)
+
+    with session_scope() as db_session:
+        account_id = db_session.scalar(select(AccountsTable.account_id).filter_by(description="Новый"))
+        save_transaction(db_session, TransactionsTable(
+            account_id=account_id, category_id=1, transaction_type="Расход",
+            transaction_date_time=START, amount=30, description=""))
+    assert balance("Новый") == Decimal(70)
+
+    with session_scope() as db_session:
+        assert get_balances(db_session, START.date())[account_id] == Decimal(100)
+        ensure_balance_snapshots(db_session, datetime.date(2025, 6, 15))
+    assert balance("Новый") == Decimal(70)
+
+
+def test_startup_snapshots_invalidate_cached_balances(engine):
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM account_balance_snapshots"))
+    assert balance("Основная карта") == Decimal(1000)
+    misses = query_cache.stats()["misses"]
+
+    # Снимки, добавленные при подготовке БД, сбрасывают закэшированные остатки
+    prepare_database(engine)
+    with session_scope() as db_session:
+        assert db_session.scalar(select(func.count()).select_from(AccountBalanceSnapshotsTable)) > 0
+    assert balance("Основная карта") == Decimal(1000)
+    assert query_cache.stats()["misses"] == misses + 1
+
+
+def test_cached_queries_see_committed_changes(engine):
+    with session_scope() as db_session:
+        assert get_recent_transactions(db_session, None, 10) == []
+    assert balance("Основная карта") == Decimal(1000)
+
+    # Повторный запрос без изменений берётся из кэша
+    hits = query_cache.stats()["hits"]
+    assert balance("Основная карта") == Decimal(1000)
+    assert query_cache.stats()["hits"] == hits + 1
+
+    # Откат не сбрасывает кэш, коммит — сбрасывает
+    with pytest.raises(RuntimeError):
+        with session_scope() as db_session:
+            save_transaction(db_session, TransactionsTable(
+                account_id=1, category_id=1, transaction_type="Расход",
+                transaction_date_time=START, amount=200, description=""))
+            raise RuntimeError
+    assert balance("Основная карта") == Decimal(1000)
+
+    with session_scope() as db_session:
+        save_transaction(db_session, TransactionsTable(
+            account_id=1, category_id=1, transaction_type="Расход",
+            transaction_date_time=START, amount=200, description=""))
+    assert balance("Основная карта") == Decimal(800)
+    with session_scope() as db_session:
+        recent = get_recent_transactions(db_session, None, 10)
+    assert [Decimal(row.amount) for row in recent] == [Decimal(200)]
+    with session_scope() as db_session:
+        assert db_session.scalar(select(func.count()).select_from(TransactionsTable)) == 1
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def shared_engine(request, tmp_path):
+    """БД, в которую пишут несколько потоков, каждый через своё соединение"""
+    if request.param == "sqlite":
+        engine = configure_engine(f"sqlite:///{tmp_path / 'concurrent.db'}",
+                                  connect_args={"check_same_thread": False, "timeout": 60})
+    else:
+        url = os.environ.get("FINANCE_TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("не задана FINANCE_TEST_POSTGRES_URL")
+        engine = configure_engine(url, pool_size=10)
+        Base.metadata.drop_all(engine)
+    prepare_database(engine)
+    query_cache.clear()
+    with engine.begin() as connection:
+        connection.execute(insert(AccountsTable), [
+            {"type": "Обычный", "amount": 10000, "icon_url": "icons/card.png", "description": f"Счёт {i}"}
+            for i in range(3)
+        ])
+        connection.execute(insert(CategoriesTable), [
+            {"category_name": "Продукты", "transaction_type": "Расход", "icon_url": "icons/categories/food.png"}
+        ])
+    yield engine
+    query_cache.clear()
+    engine.dispose()
+
+
+def test_concurrent_writes_lose_no_updates(shared_engine, threads=6, operations=40):
+    account_ids = [1, 2, 3]
+    expected = {account_id: Decimal(10000) for account_id in account_ids}
+    errors = []
+    lock = threading.Lock()
+
+    def write(seed):
+        rnd = random.Random(seed)
+        for i in range(operations):
+            # Переводы в обе стороны между одними и теми же счетами: без общего порядка блокировок
+            # встречные переводы взаимоблокировались бы
+            from_id, to_id = (1, 2) if (seed + i) % 2 else (2, 1)
+            if i % 3 == 2:
+                from_id, to_id = rnd.sample(account_ids, 2)
+            amount = Decimal(rnd.randint(1, 10000)) / 100
+            try:
+                with session_scope() as db_session:
+                    if i % 4 == 3:
+                        save_transaction(db_session, TransactionsTable(
+                            account_id=from_id, category_id=1, transaction_type="Расход",
+                            transaction_date_time=START, amount=amount, description=""))
+                        changes = {from_id: -amount}
+                    else:
+                        save_transfer(db_session, TransfersTable(
+                            from_account=from_id, to_account=to_id, transfer_date_time=START,
+                            amount=amount, description=""))
+                        changes = {from_id: -amount, to_id: amount}
+            except OperationalError as error:
+                with lock:
+                    errors.append(error)
+                continue
+            with lock:
+                for account_id, delta in changes.items():
+                    expected[account_id] += delta
+
+    workers = [threading.Thread(target=write, args=(seed,)) for seed in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    with session_scope() as db_session:
+        stored = dict(db_session.execute(select(AccountsTable.account_id, AccountsTable.amount)).all())
+        ledger = get_balances(db_session)
+    assert stored == expected
+    assert ledger == expected
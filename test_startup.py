@@ -0,0 +1,46 @@
+"""
+Проверка времени запуска: импорт main.py в отдельном процессе укладывается в бюджет
+и не загружает matplotlib и numpy (они импортируются при первом построении графика).
+
+Запуск:
+    python -m pytest test_startup.py
+"""
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BUDGET_MS = 1500
+RUNS = 3
+
+STARTUP_PROBE = """
+import sys, time
+started = time.perf_counter()
+import main
+print(time.perf_counter() - started)
+print(",".join(name for name in ("matplotlib", "numpy") if name in sys.modules))
+"""
+
+
+def import_main() -> tuple[float, str]:
+    """Импортирует main.py в новом интерпретаторе с -X importtime, возвращает время в мс и загруженные тяжёлые модули"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_PROBE],
+                            cwd=Path(__file__).resolve().parent, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1]
+        if error.startswith("ModuleNotFoundError"):
+            pytest.skip(f"не установлены зависимости приложения: {error}")
+        pytest.fail(f"не удалось импортировать main.py: {error}")
+    seconds, loaded = result.stdout.splitlines()[-2:]
+    return float(seconds) * 1000, loaded
+
+
+def test_main_imports_within_budget():
+    timings = []
+    for _ in range(RUNS):
+        milliseconds, loaded = import_main()
+        assert loaded == "", f"при запуске загружаются {loaded}"
+        timings.append(milliseconds)
+    assert statistics.median(timings) <= BUDGET_MS
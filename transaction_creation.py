@@ -1,5 +1,4 @@
 import datetime
-from decimal import Decimal
 import os
 
 import customtkinter as ctk
@@ -8,9 +7,11 @@ from tkinter import filedialog
 from CustomTkinterMessagebox import CTkMessagebox
 from PIL import Image
 
-from db_management import AccountsTable, session, CategoriesTable, TransactionsTable
+from db_management import (AccountsTable, Session, session_scope, CategoriesTable, TransactionsTable,
+                           save_transaction)
 from addition_classes import ToggleButton, app_color, FormattedEntry, resource_path
 from main_page import open_pop_up_calendar
+from event_bus import event_bus, ChangeEvent
 from pop_up_calendar import PopUpCalendar
 
 transactions_history = {}
@@ -76,7 +77,8 @@ class CategoriesAccountsFrame(ctk.CTkScrollableFrame):
         self.accounts_buttons = []
         self.accounts_labels = []
 
-        self.accs = session.query(AccountsTable).all()
+        with Session() as db_session:
+            self.accs = db_session.query(AccountsTable).all()
         for acc in self.accs:
             exp_image = ctk.CTkImage(light_image=Image.open(resource_path(f"assets/{acc.icon_url}")), size=(40, 40))
             exp_button = ToggleButton(self, text_color="black", text="", width=50, height=50, image=exp_image,
@@ -93,8 +95,11 @@ class CategoriesAccountsFrame(ctk.CTkScrollableFrame):
         self.cat_exp_labels: list[ctk.CTkLabel] = []
         self.cat_inc_labels: list[ctk.CTkLabel]  = []
 
-        self.cat_exp_query = session.query(CategoriesTable).filter(CategoriesTable.transaction_type == "Расход").all()
-        self.cat_inc_query = session.query(CategoriesTable).filter(CategoriesTable.transaction_type == "Доход").all()
+        with Session() as db_session:
+            self.cat_exp_query = (db_session.query(CategoriesTable)
+                                  .filter(CategoriesTable.transaction_type == "Расход").all())
+            self.cat_inc_query = (db_session.query(CategoriesTable)
+                                  .filter(CategoriesTable.transaction_type == "Доход").all())
 
         for cat_exp in self.cat_exp_query:
             exp_image = ctk.CTkImage(light_image=Image.open(resource_path(f"assets/{cat_exp.icon_url}")), size=(40, 40))
@@ -358,31 +363,25 @@ class NewTransactionWindow(ctk.CTkToplevel):
             return
       
 
-        account = session.query(AccountsTable).filter_by(description=account_name).first()
-        category = session.query(CategoriesTable).filter_by(category_name=category_name).first()
-
-        transaction = TransactionsTable(
-            transaction_date_time=date_time,
-            transaction_type=category_type,
-            amount=float(amount),
-            description=description,
-            account_id=account.account_id,
-            category_id=category.category_id,
-            #check_photo_url=receipt_name
-            check_photo=self.selected_receipt_data
-        )
-
-        amount = Decimal(self.amount_entry.amount)
-        if category_type == self.expenses_button_text:
-            account.amount -= amount
-        else:
-            account.amount += amount
-
-        session.add(transaction)
-        session.commit()
-
-        if self.app_instance:
-            self.app_instance.update_transactions()
+        with session_scope() as db_session:
+            account = db_session.query(AccountsTable).filter_by(description=account_name).first()
+            category = db_session.query(CategoriesTable).filter_by(category_name=category_name).first()
+
+            transaction = TransactionsTable(
+                transaction_date_time=date_time,
+                transaction_type=category_type,
+                amount=float(amount),
+                description=description,
+                account_id=account.account_id,
+                category_id=category.category_id,
+                #check_photo_url=receipt_name
+                check_photo=self.selected_receipt_data
+            )
+
+            save_transaction(db_session, transaction)
+
+        event_bus.publish(ChangeEvent("transaction", (transaction.account_id,), transaction.category_id,
+                                      transaction.transaction_type, date_time.date()))
         self._destroy()
 
     def change_state(self):
@@ -1,32 +1,58 @@
 import customtkinter as ctk
 from PIL import Image
 import tempfile
+import textwrap
 import os
 import platform
 import subprocess
 
 from addition_classes import resource_path
-from db_management import session, TransactionsTable, TransfersTable
+from db_management import get_transactions_history, get_transfers_history, get_receipt
+from query_executor import query_executor
+from event_bus import event_bus, LazyRefreshMixin
+from virtual_table import VirtualTable, PagedRowProvider
 
 
-class TransactionsFrame(ctk.CTkScrollableFrame):
+class HistoryTable(VirtualTable):
+    """История операций: строки подгружаются страницами по ключу, виджеты создаются только для видимых строк"""
+    history_query = None
+    key_fields: tuple[str, ...] = ()  # поля ключа страницы, в порядке сортировки истории (см. history_query)
+
     def __init__(self, master, **kwargs):
-        super().__init__(master, **kwargs)
+        self.account_images = {}  # иконка счёта -> CTkImage, счетов немного
+        super().__init__(master, PagedRowProvider(self.history_query, self.row_key), **kwargs)
+
+    def account_image(self, icon_url: str) -> ctk.CTkImage:
+        if icon_url not in self.account_images:
+            self.account_images[icon_url] = ctk.CTkImage(
+                light_image=Image.open(resource_path(f"assets/{icon_url}")), size=(30, 30))
+        return self.account_images[icon_url]
+
+    def row_key(self, row) -> tuple:
+        return tuple(getattr(row, field) for field in self.key_fields)
+
 
-        self.configure(fg_color="#aba6a6")
-        self.grid_rowconfigure(0, weight=1)
+class TransactionsFrame(HistoryTable):
+    # Заголовки таблицы (без "Действия")
+    headers = ["Счёт", "Дата", "Категория", "Сумма", "Комментарий", "Чек"]
+    empty_text = "Нет транзакций за выбранный период"
+    history_query = staticmethod(get_transactions_history)
+    key_fields = ("transaction_date_time", "transaction_id")
 
-        self.update_frame()
+    def __init__(self, master, **kwargs):
+        self.receipt_icon = None
+        super().__init__(master, **kwargs)
 
     def show_receipt(self, transaction_id):
         """Показывает чек для указанной транзакции"""
-        transaction = session.query(TransactionsTable).filter_by(transaction_id=transaction_id).first()
-        
-        if transaction and transaction.check_photo:
+        query_executor.run_in_background(self, get_receipt, transaction_id, on_done=self.open_receipt)
+
+    def open_receipt(self, check_photo):
+        if check_photo:
             try:
                 # Создаем временный файл для просмотра
                 with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-                    temp_file.write(transaction.check_photo)
+                    temp_file.write(check_photo)
                     temp_path = temp_file.name
                 
                 # Открываем изображение средствами системы
@@ -43,160 +69,95 @@ class TransactionsFrame(ctk.CTkScrollableFrame):
         else:
             from CustomTkinterMessagebox import CTkMessagebox
             CTkMessagebox.messagebox(title="Информация", text="Чек не найден")
-            
 
-    def update_frame(self):
-        # Очищаем текущие виджеты
-        for widget in self.winfo_children():
-            widget.destroy()
-
-        transactions = (
-            session.query(TransactionsTable)
-            .order_by(TransactionsTable.transaction_date_time.desc())
-            .all()
+    def create_row(self, grid_row):
+        # Счёт
+        account_label = ctk.CTkLabel(self, text="", compound="left", font=("Arial", 16))
+        account_label.grid(row=grid_row, column=0, sticky="nsew", padx=10, pady=5)
+
+        # Дата
+        date_label = ctk.CTkLabel(self, text="", text_color="black", font=("Arial", 16))
+        date_label.grid(row=grid_row, column=1, sticky="nsew", padx=10, pady=5)
+
+        # Категория
+        category_label = ctk.CTkLabel(self, text="", font=("Arial", 16))
+        category_label.grid(row=grid_row, column=2, sticky="nsew", padx=10, pady=5)
+
+        # Сумма
+        amount_label = ctk.CTkLabel(self, text="", font=("Arial", 16, "bold"))
+        amount_label.grid(row=grid_row, column=3, sticky="nsew", padx=10, pady=5)
+
+        # Комментарий: в строке фиксированной высоты помещаются две строки текста
+        comment_label = ctk.CTkLabel(self, text="", text_color="black", font=("Arial", 16), wraplength=150)
+        comment_label.grid(row=grid_row, column=4, sticky="nsew", padx=10, pady=5)
+
+        # Чек: кликабельная иконка, если чек есть, иначе прочерк
+        if self.receipt_icon is None:
+            self.receipt_icon = ctk.CTkImage(light_image=Image.open(resource_path("assets/icons/receipt.png")),
+                                             size=(30, 30))
+        receipt_button = ctk.CTkButton(
+            self,
+            text="",
+            image=self.receipt_icon,
+            width=40,
+            height=40,
+            fg_color="transparent",
+            hover_color="#d3d3d3"  # Светло-серый при наведении
         )
-        transactions_history = [
-            {
-                 "transaction_id": t.transaction_id,
-                "Счёт": t.account.icon_url,
-                "Дата": t.transaction_date_time.strftime("%d.%m.%y"),
-                "Категория": {
-                    "Имя" : t.category.category_name,
-                    "Цвет": t.category.colour
-                },
-                "Сумма": {
-                    "Количество" : float(t.amount),
-                    "Тип": t.transaction_type
-                },
-                "Комментарий": t.description or "",
-                "Чек": t.check_photo is not None  # Есть ли чек
-            }
-            for t in transactions
-        ]
-
-        if not transactions_history:
-            ctk.CTkLabel(self, text="Нет транзакций за выбранный период", font=("Arial", 20)).pack(padx=20, pady=20)
-            return
-        
-        # Заголовки таблицы (без "Действия")
-        headers = ["Счёт", "Дата", "Категория", "Сумма", "Комментарий", "Чек"]
-        
-        for col, name in enumerate(headers):
-            label = ctk.CTkLabel(self, text=name, text_color="black", font=("Arial", 16, "bold"))
-            label.grid(row=0, column=col, sticky="nsew", padx=10, pady=10)
-
-        # Данные транзакций
-        for i, tr in enumerate(transactions_history):
-            row = i + 1
-            
-            # Счёт
-            icon_image = Image.open(resource_path(f"assets/{tr['Счёт']}"))
-            account_label = ctk.CTkLabel(self, image=ctk.CTkImage(light_image=icon_image, size=(30, 30)), text="",
-                                        compound="left", font=("Arial", 16))
-            account_label.grid(row=row, column=0, sticky="nsew", padx=10, pady=10)
-            
-            # Дата
-            date_label = ctk.CTkLabel(self, text=tr["Дата"], text_color="black", font=("Arial", 16))
-            date_label.grid(row=row, column=1, sticky="nsew", padx=10, pady=10)
-            
-            # Категория
-            cat_color = tr["Категория"]["Цвет"]
-            cat_name = tr["Категория"]["Имя"]
-            category_label = ctk.CTkLabel(self, text=cat_name, text_color=cat_color, font=("Arial", 16))
-            category_label.grid(row=row, column=2, sticky="nsew", padx=10, pady=10)
-            
-            # Сумма
-            amount_color = "red" if tr["Сумма"]["Тип"] == "Расход" else "green"
-            amount_value = f"{tr['Сумма']['Количество']:,.2f}"
-            amount_label = ctk.CTkLabel(self, text=amount_value, text_color=amount_color, 
-                                       font=("Arial", 16, "bold"))
-            amount_label.grid(row=row, column=3, sticky="nsew", padx=10, pady=10)
-            
-            # Комментарий
-            comment_text = tr["Комментарий"] if tr["Комментарий"] else "—"
-            comment_label = ctk.CTkLabel(self, text=comment_text, text_color="black", 
-                                        font=("Arial", 16), wraplength=150)
-            comment_label.grid(row=row, column=4, sticky="nsew", padx=10, pady=10)
-            
-            # Чек (кликабельная иконка)
-            if tr["Чек"]:  # Если чек есть
-                receipt_icon = ctk.CTkImage(
-                    light_image=Image.open(resource_path("assets/icons/receipt.png")), 
-                    size=(30, 30)
-                )
-                
-                # Создаем кнопку с иконкой вместо метки
-                receipt_button = ctk.CTkButton(
-                    self, 
-                    text="", 
-                    image=receipt_icon,
-                    width=40,
-                    height=40,
-                    fg_color="transparent",
-                    hover_color="#d3d3d3",  # Светло-серый при наведении
-                    command=lambda tid=tr["transaction_id"]: self.show_receipt(tid)
-                )
-                receipt_button.grid(row=row, column=5, padx=10, pady=10)  # Убрали sticky="center"
-            else:  # Если чека нет
-                no_receipt_label = ctk.CTkLabel(self, text="—", text_color="white", font=("Arial", 16))
-                no_receipt_label.grid(row=row, column=5, padx=10, pady=10)  # Убрали sticky="center"
-       
-
-
-class TransfersFrame(ctk.CTkScrollableFrame):
-    def __init__(self, master, **kwargs):
-        super().__init__(master, **kwargs)
-
-        self.configure(fg_color="#aba6a6")
-        self.grid_rowconfigure(0, weight=1)
-
-        self.update_frame()
-
-
-    
-            
-            
-    def update_frame(self):
-        transfers = (
-            session.query(TransfersTable)
-            .order_by(TransfersTable.transfer_date_time.desc())
-            .all()
-        )
-        transfers_history = [
-            {
-                "С": t.from_account_ref.icon_url,
-                "На": t.to_account_ref.icon_url,
-                "Дата": t.transfer_date_time.strftime("%d.%m.%y"),
-                "Сумма": float(t.amount),
-                "Комментарий": t.description or ""
-            }
-            for t in transfers
-        ]
-
-        if not transfers_history:
-            ctk.CTkLabel(self, text="Нет переводов за выбранный период", font=("Arial", 20)).pack(padx=20, pady=20)
-            return
-
-        for col, name in enumerate(transfers_history[0].keys()):
-            label = ctk.CTkLabel(self, text=name, text_color="black", font=("Arial", 16, "bold"))
-            label.grid(row=0, column=col, sticky="nsew", padx=10, pady=10)
-
-        for i, tr in enumerate(transfers_history):
-            for j, (key, value) in enumerate(tr.items()):
-                if key == "Сумма":
-                    value = f"{value:,.2f}"
-
-                if key == "С" or key == "На":
-                    icon_image = Image.open(resource_path(f"assets/{tr[key]}"))
-                    label = ctk.CTkLabel(self, image=ctk.CTkImage(light_image=icon_image, size=(30, 30)), text="",
-                                         compound="left", font=("Arial", 16))
-                else:
-                    label = ctk.CTkLabel(self, text=value, text_color="black", font=("Arial", 16), wraplength=170)
-
-                label.grid(row=i+1, column=j, sticky="nsew", padx=10, pady=10)
-
-
-class TransactionsPage(ctk.CTkFrame):
+        receipt_button.grid(row=grid_row, column=5, padx=10, pady=5)
+        no_receipt_label = ctk.CTkLabel(self, text="—", text_color="white", font=("Arial", 16))
+        no_receipt_label.grid(row=grid_row, column=5, padx=10, pady=5)
+
+        return [account_label, date_label, category_label, amount_label, comment_label,
+                receipt_button, no_receipt_label]
+
+    def bind_row(self, cells, tr):
+        account_label, date_label, category_label, amount_label, comment_label, receipt_button, no_receipt_label = cells
+
+        account_label.configure(image=self.account_image(tr.account_icon_url))
+        date_label.configure(text=tr.transaction_date_time.strftime("%d.%m.%y"))
+        category_label.configure(text=tr.category_name or "—", text_color=tr.colour or "black")
+        amount_label.configure(text=f"{float(tr.amount):,.2f}",
+                               text_color="red" if tr.transaction_type == "Расход" else "green")
+        comment_label.configure(text=textwrap.shorten(tr.description or "—", width=30, placeholder="…"))
+
+        if tr.has_receipt:
+            receipt_button.configure(command=lambda tid=tr.transaction_id: self.show_receipt(tid))
+            no_receipt_label.grid_remove()
+            receipt_button.grid()
+        else:
+            receipt_button.grid_remove()
+            no_receipt_label.grid()
+
+
+class TransfersFrame(HistoryTable):
+    headers = ["С", "На", "Дата", "Сумма", "Комментарий"]
+    empty_text = "Нет переводов за выбранный период"
+    history_query = staticmethod(get_transfers_history)
+    key_fields = ("transfer_date_time", "transfer_id")
+
+    def create_row(self, grid_row):
+        cells = []
+        for col in range(2):
+            label = ctk.CTkLabel(self, text="", compound="left", font=("Arial", 16))
+            label.grid(row=grid_row, column=col, sticky="nsew", padx=10, pady=5)
+            cells.append(label)
+        for col in range(2, 5):
+            label = ctk.CTkLabel(self, text="", text_color="black", font=("Arial", 16), wraplength=170)
+            label.grid(row=grid_row, column=col, sticky="nsew", padx=10, pady=5)
+            cells.append(label)
+        return cells
+
+    def bind_row(self, cells, tr):
+        from_label, to_label, date_label, amount_label, comment_label = cells
+        from_label.configure(image=self.account_image(tr.from_icon_url))
+        to_label.configure(image=self.account_image(tr.to_icon_url))
+        date_label.configure(text=tr.transfer_date_time.strftime("%d.%m.%y"))
+        amount_label.configure(text=f"{float(tr.amount):,.2f}")
+        comment_label.configure(text=textwrap.shorten(tr.description or "", width=30, placeholder="…"))
+
+
+class TransactionsPage(LazyRefreshMixin, ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
 
@@ -213,8 +174,9 @@ class TransactionsPage(ctk.CTkFrame):
         self.transfers_frame = TransfersFrame(self, corner_radius=10)
         self.transfers_frame.grid(row=1, column=1, padx=(5, 10), pady=10, sticky="nsew")
 
-    def update_transactions(self):
-        self.transactions_frame.update_frame()
-
-    def update_transfers(self):
-        self.transfers_frame.update_frame()
\ No newline at end of file
+        self.init_lazy_refresh({
+            "transactions": self.transactions_frame.update_frame,
+            "transfers": self.transfers_frame.update_frame,
+        })
+        event_bus.subscribe("transaction", lambda event: self.mark_dirty("transactions"))
+        event_bus.subscribe("transfer", lambda event: self.mark_dirty("transfers"))
\ No newline at end of file
@@ -6,9 +6,16 @@ from CustomTkinterMessagebox import CTkMessagebox
 from PIL import Image
 
 from addition_classes import ToggleButton, FormattedEntry, resource_path
-from db_management import TransfersTable, session, AccountsTable
+from db_management import TransfersTable, session_scope, AccountsTable, save_transfer
 from main_page import open_pop_up_calendar
+from event_bus import event_bus, ChangeEvent
 from pop_up_calendar import PopUpCalendar
+from query_executor import query_executor
+
+
+def get_account_icons(db_session):
+    return (db_session.query(AccountsTable.description, AccountsTable.icon_url)
+            .order_by(AccountsTable.account_id).all())
 
 
 class AccountsIconsFrame(ctk.CTkScrollableFrame):
@@ -18,10 +25,14 @@ class AccountsIconsFrame(ctk.CTkScrollableFrame):
 
         self.buttons_in_row = 3
         self.selected_account_name = None
+        self.accounts_query = []
         self.accounts_buttons = []
         self.accounts_labels = []
 
-        self.accounts_query = session.query(AccountsTable).all()
+        query_executor.run_in_background(self, get_account_icons, on_done=self.show_accounts, key="accounts")
+
+    def show_accounts(self, accounts):
+        self.accounts_query = accounts
         for acc in self.accounts_query:
             exp_image = ctk.CTkImage(light_image=Image.open(resource_path(f"assets/{acc.icon_url}")), size=(40, 40))
             exp_button = ToggleButton(self, text_color="black", text="", width=50, height=50, image=exp_image,
@@ -162,26 +173,22 @@ class NewTransferWindow(ctk.CTkToplevel):
             return
 
 
-        from_account = session.query(AccountsTable).filter_by(description=self.from_acc_name).first()
-        to_account = session.query(AccountsTable).filter_by(description=self.to_acc_name).first()
+        with session_scope() as db_session:
+            from_account = db_session.query(AccountsTable).filter_by(description=self.from_acc_name).first()
+            to_account = db_session.query(AccountsTable).filter_by(description=self.to_acc_name).first()
 
-        transfer = TransfersTable(
-            from_account=from_account.account_id,
-            to_account=to_account.account_id,
-            transfer_date_time=date_time,
-            amount=amount,
-            description=description
-        )
-
-        amount = Decimal(self.amount_entry.amount)
-        from_account.amount -= amount
-        to_account.amount += amount
+            transfer = TransfersTable(
+                from_account=from_account.account_id,
+                to_account=to_account.account_id,
+                transfer_date_time=date_time,
+                amount=amount,
+                description=description
+            )
 
-        session.add(transfer)
-        session.commit()
+            save_transfer(db_session, transfer)
 
-        if self.app_instance:
-            self.app_instance.update_transfers()
+        event_bus.publish(ChangeEvent("transfer", (transfer.from_account, transfer.to_account),
+                                      date=date_time.date()))
         self._destroy()
 
     def get_date_display_text(self):
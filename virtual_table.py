@@ -0,0 +1,251 @@
+import sys
+from abc import ABCMeta, abstractmethod
+
+import customtkinter as ctk
+
+from query_executor import query_executor
+
+
+class PagedRowProvider:
+    """
+    Источник строк для VirtualTable: хранит уже загруженные строки и подгружает следующие страницы
+    в фоне по ключу последней строки — query(db_session, after, limit), как get_transactions_history
+    """
+    def __init__(self, query, row_key, page_size: int = 100):
+        self.query = query
+        self.row_key = row_key
+        self.page_size = page_size
+        self.reset()
+
+    def reset(self):
+        self.rows = []
+        self.has_more = True
+        self.loading = False
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def load_more(self, widget, on_done):
+        """Загружает следующую страницу и вызывает on_done() в главном потоке"""
+        if self.loading or not self.has_more:
+            return
+        self.loading = True
+        after = self.row_key(self.rows[-1]) if self.rows else None
+
+        def add_page(rows):
+            self.loading = False
+            self.rows.extend(rows)
+            self.has_more = len(rows) == self.page_size
+            on_done()
+
+        def fail(error):
+            self.loading = False
+            self.has_more = False
+            print(f"❌ Ошибка загрузки истории: {error}")
+            on_done()
+
+        query_executor.run_in_background(widget, self.query, after, self.page_size,
+                                         on_done=add_page, on_error=fail, key="page")
+
+
+class VirtualTable(ctk.CTkFrame, metaclass=ABCMeta):
+    """
+    Таблица, которая создаёт виджеты только для строк, помещающихся на экране, и при прокрутке
+    заново заполняет их данными других строк. Стоимость прокрутки и обновления зависит от высоты
+    таблицы, а не от длины истории. Строки берутся из provider (см. PagedRowProvider);
+    подклассы создают виджеты строки в create_row и заполняют их в bind_row
+    """
+    headers: list[str] = []
+    empty_text = ""
+    row_height = 50  # пикс.; высота строки фиксирована, иначе нельзя посчитать видимые строки
+    wheel_rows = 3   # строк за один шаг колёсика мыши
+
+    def __init__(self, master, provider: PagedRowProvider, **kwargs):
+        super().__init__(master, **kwargs)
+        self.configure(fg_color="#aba6a6")
+        # Размер таблицы задаёт родитель, а не число строк внутри — иначе <Configure> зациклится
+        self.grid_propagate(False)
+
+        self.provider = provider
+        self.top = 0  # индекс первой видимой строки
+        self.slots = []  # виджеты видимых строк: то, что вернул create_row
+        self.hidden_slots = set()  # строки сетки без данных (конец истории)
+        self.scaled_row_height = round(self._apply_widget_scaling(self.row_height))
+
+        for col, name in enumerate(self.headers):
+            self.grid_columnconfigure(col, weight=1)
+            label = ctk.CTkLabel(self, text=name, text_color="black", font=("Arial", 16, "bold"))
+            label.grid(row=0, column=col, sticky="nsew", padx=10, pady=10)
+        self.grid_rowconfigure(0, minsize=self.scaled_row_height)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.status_label = ctk.CTkLabel(self, text="", text_color="black", font=("Arial", 16))
+
+        self.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self)
+
+        self.update_frame()
+
+    @abstractmethod
+    def create_row(self, grid_row: int) -> list:
+        """Создаёт виджеты одной строки в строке grid_row сетки и возвращает их"""
+
+    @abstractmethod
+    def bind_row(self, cells, row):
+        """Заполняет виджеты строки данными row"""
+
+    def show_cells(self, cells, visible: bool):
+        """Показывает или прячет всю строку; подклассы могут затем спрятать отдельные ячейки в bind_row"""
+        for widget in cells:
+            if visible:
+                widget.grid()
+            else:
+                widget.grid_remove()
+
+    def _bind_wheel(self, widget):
+        if sys.platform.startswith("linux"):
+            widget.bind("<Button-4>", lambda event: self.scroll_rows(-self.wheel_rows))
+            widget.bind("<Button-5>", lambda event: self.scroll_rows(self.wheel_rows))
+        else:
+            widget.bind("<MouseWheel>", self._on_wheel)
+
+    def _on_wheel(self, event):
+        # Windows: шаг колёсика 120, macOS: небольшие значения, растущие при быстрой прокрутке
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_rows(-steps * self.wheel_rows)
+
+    def _on_resize(self, event):
+        visible = max(1, (event.height - self.scaled_row_height) // self.scaled_row_height)
+        if visible == len(self.slots):
+            return
+
+        # Недостающие строки создаются, лишние удаляются; остальные переиспользуются
+        while len(self.slots) < visible:
+            grid_row = len(self.slots) + 1
+            self.grid_rowconfigure(grid_row, minsize=self.scaled_row_height)
+            cells = self.create_row(grid_row)
+            for widget in cells:
+                self._bind_wheel(widget)
+            self.slots.append(cells)
+        while len(self.slots) > visible:
+            for widget in self.slots.pop():
+                widget.destroy()
+            self.hidden_slots.discard(len(self.slots))
+            self.grid_rowconfigure(len(self.slots) + 1, minsize=0)
+
+        self.scrollbar.grid(row=0, column=len(self.headers), rowspan=visible + 1, sticky="ns", padx=(0, 5), pady=5)
+        self.render()
+
+    def _on_scrollbar(self, action, value, units=None):
+        if action == "moveto":
+            self.scroll_to(round(float(value) * len(self.provider)))
+        elif action == "scroll":
+            step = len(self.slots) if units == "pages" else 1
+            self.scroll_rows(int(value) * step)
+
+    def scroll_rows(self, delta: int):
+        self.scroll_to(self.top + delta)
+
+    def scroll_to(self, index: int):
+        top = max(0, min(index, len(self.provider) - len(self.slots)))
+        if top != self.top:
+            self.top = top
+            self.render()
+        self._maybe_load_more()
+
+    def _maybe_load_more(self):
+        # Следующая страница запрашивается заранее, пока до конца загруженных строк остаётся экран
+        if self.top + 2 * len(self.slots) >= len(self.provider):
+            self.provider.load_more(self, self._on_rows_loaded)
+
+    def _on_rows_loaded(self):
+        self.render()
+        self._maybe_load_more()
+
+    def update_frame(self):
+        """Перечитывает историю с начала"""
+        self.provider.reset()
+        self.top = 0
+        self.render()
+        self.provider.load_more(self, self._on_rows_loaded)
+
+    def render(self):
+        for i, cells in enumerate(self.slots):
+            index = self.top + i
+            if index < len(self.provider):
+                if i in self.hidden_slots:
+                    self.hidden_slots.discard(i)
+                    self.show_cells(cells, True)
+                self.bind_row(cells, self.provider[index])
+            elif i not in self.hidden_slots:
+                self.hidden_slots.add(i)
+                self.show_cells(cells, False)
+
+        total = len(self.provider)
+        if total:
+            first = self.top / total
+            self.scrollbar.set(first, min(1.0, first + len(self.slots) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+        if not total:
+            status = "Загрузка..." if self.provider.loading else self.empty_text
+        else:
+            status = "Загрузка..." if self.provider.loading and self.top + len(self.slots) >= total else ""
+        if status:
+            self.status_label.configure(text=status)
+            self.status_label.grid(row=min(total - self.top, len(self.slots)) + 1, column=0,
+                                   columnspan=len(self.headers), padx=10, pady=10)
+        else:
+            self.status_label.grid_remove()
+
+
+class RecentRowsFrame(ctk.CTkScrollableFrame, metaclass=ABCMeta):
+    """
+    Короткий список последних строк (не больше limit), хранящий виджеты по ключу строки.
+    При обновлении создаются виджеты только для новых строк, виджеты выпавших из списка строк удаляются,
+    остальные лишь переставляются, поэтому число виджетов не растёт от обновления к обновлению
+    """
+    limit = 30
+    first_row = 0  # строка сетки для первой записи (выше могут быть заголовки)
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_widgets = {}  # ключ строки -> (строка, её виджеты, строка сетки)
+
+    @abstractmethod
+    def row_key(self, row):
+        """Ключ строки, по которому её виджеты узнаются при следующих обновлениях"""
+
+    @abstractmethod
+    def create_row(self, row, grid_row: int) -> list:
+        """Создаёт и размещает виджеты строки, возвращает их"""
+
+    def apply_rows(self, rows):
+        """Приводит список к rows (новые сверху)"""
+        rows = rows[:self.limit]
+        keys = [self.row_key(row) for row in rows]
+        wanted = set(keys)
+
+        for key in [key for key in self.row_widgets if key not in wanted]:
+            for widget in self.row_widgets.pop(key)[1]:
+                widget.destroy()
+
+        for i, (key, row) in enumerate(zip(keys, rows)):
+            grid_row = self.first_row + i
+            known = self.row_widgets.get(key)
+            if known is not None and known[0] != row:
+                # Строка изменилась (например, переименована категория) — пересоздаём её виджеты
+                for widget in known[1]:
+                    widget.destroy()
+                known = None
+
+            if known is None:
+                self.row_widgets[key] = (row, self.create_row(row, grid_row), grid_row)
+            elif known[2] != grid_row:
+                for widget in known[1]:
+                    widget.grid(row=grid_row)
+                self.row_widgets[key] = (row, known[1], grid_row)